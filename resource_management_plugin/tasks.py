@@ -23,12 +23,14 @@ def calculate_resources_availability(ctx, mode=DEFAULT_MODE, **kwargs):
     Args:
         mode: flag decides how workflow will run executions to gather required
             values (e.g. 'list' operation for usage). It can be 'simple'
-            (default) or 'parallel'.
+            (default), 'parallel', 'batch', 'windowed' or 'concurrent'.
+        **kwargs: additional engine settings, e.g. 'project_workers' -
+            number of threads used for loading project deployments.
 
     Returns:
         None, In case of success workflow execution will finish normally."""
     rest_client = manager.get_rest_client()
-    engine = Engine(ctx, rest_client)
+    engine = Engine(ctx, rest_client, **kwargs)
     engine.run(MODES[mode])
 
 
@@ -38,6 +40,8 @@ def check_resources_availability(ctx,
                                  profile_name=None,
                                  profile_str=None,
                                  mode=DEFAULT_MODE,
+                                 fail_fast=False,
+                                 prune_to_profile=False,
                                  **kwargs):
     """Get resource availability and validate.
 
@@ -60,7 +64,16 @@ def check_resources_availability(ctx,
             secret store.
         mode: flag decides how workflow will run executions to gather required
             values (e.g. 'list' operation for usage). It can be 'simple'
-            (default) or 'parallel'.
+            (default), 'parallel', 'batch', 'windowed' or 'concurrent'.
+        fail_fast: validate requirements during calculation - workflow
+            fails (and started executions are cancelled) as soon as any
+            requirement is not met.
+        prune_to_profile: collect only resources required by profile -
+            'Quota' / 'Usage' node instances which cannot provide them and
+            projects other than 'project_id' are skipped (collected data is
+            not complete then).
+        **kwargs: additional engine settings, e.g. 'project_workers' -
+            number of threads used for loading project deployments.
 
     Returns:
         None, In case of success workflow execution will finish normally.
@@ -73,9 +86,15 @@ def check_resources_availability(ctx,
         workflow execution will be in 'failed' state."""
 
     rest_client = manager.get_rest_client()
-    engine = Engine(ctx, rest_client)
+    engine = Engine(ctx, rest_client, **kwargs)
     profile = get_profile(rest_client, profile_name, profile_str)
 
+    if prune_to_profile:
+        engine.limit_to_profile(project_id, profile)
+
+    if fail_fast:
+        engine.enable_fail_fast(project_id, profile)
+
     engine.run(MODES[mode])
     ctx.logger.info(
         'Calculating resources availability finished.\n'
@@ -91,6 +110,8 @@ def execute_conditionally(ctx,
                           profile_name=None,
                           profile_str=None,
                           mode=DEFAULT_MODE,
+                          fail_fast=False,
+                          prune_to_profile=False,
                           **kwargs):
     """Run workflow conditionally to avaible resources.
 
@@ -120,15 +141,30 @@ def execute_conditionally(ctx,
             using secret store.
         mode: flag decides how workflow will run executions to gather required
             values (e.g. 'list' operation for usage). It can be 'simple'
-            (default) or 'parallel'.
+            (default), 'parallel', 'batch', 'windowed' or 'concurrent'.
+        fail_fast: validate requirements during calculation - workflow
+            fails (and started executions are cancelled) as soon as any
+            requirement is not met.
+        prune_to_profile: collect only resources required by profile -
+            'Quota' / 'Usage' node instances which cannot provide them and
+            projects other than 'project_id' are skipped (collected data is
+            not complete then).
+        **kwargs: additional engine settings, e.g. 'project_workers' -
+            number of threads used for loading project deployments.
 
     Returns:
         None, In case of success workflow execution will finish normally."""
 
     rest_client = manager.get_rest_client()
-    engine = Engine(ctx, rest_client)
+    engine = Engine(ctx, rest_client, **kwargs)
     profile = get_profile(rest_client, profile_name, profile_str)
 
+    if prune_to_profile:
+        engine.limit_to_profile(project_id, profile)
+
+    if fail_fast:
+        engine.enable_fail_fast(project_id, profile)
+
     engine.run(MODES[mode])
     ctx.logger.info(
         'Calculating resources availability finished.\n'
@@ -63,8 +63,33 @@ class TestTasks(unittest.TestCase):
                                                    project_id='project_id',
                                                    profile_str='abc')
         engine_gen.assert_called_with(_ctx, rest_client)
+        engine.limit_to_profile.assert_not_called()
+        engine.enable_fail_fast.assert_not_called()
         engine.validate_profile.assert_called_with('project_id', 'abc')
 
+        # fail fast
+        with patch("resource_management_plugin.tasks.manager",
+                   manager_mock):
+            with patch("resource_management_plugin.tasks.Engine",
+                       engine_gen):
+                tasks.check_resources_availability(ctx=_ctx,
+                                                   project_id='project_id',
+                                                   profile_str='abc',
+                                                   fail_fast=True)
+        engine.enable_fail_fast.assert_called_with('project_id', 'abc')
+        engine.limit_to_profile.assert_not_called()
+
+        # prune to profile
+        with patch("resource_management_plugin.tasks.manager",
+                   manager_mock):
+            with patch("resource_management_plugin.tasks.Engine",
+                       engine_gen):
+                tasks.check_resources_availability(ctx=_ctx,
+                                                   project_id='project_id',
+                                                   profile_str='abc',
+                                                   prune_to_profile=True)
+        engine.limit_to_profile.assert_called_with('project_id', 'abc')
+
     def test_execute_conditionally(self):
         _ctx = self._gen_ctx()
         _ctx.node_instances = []
@@ -83,9 +108,22 @@ class TestTasks(unittest.TestCase):
                                             project_id='project_id',
                                             profile_str='abc')
         engine_gen.assert_called_with(_ctx, rest_client)
+        engine.limit_to_profile.assert_not_called()
         engine.validate_profile.assert_called_with('project_id', 'abc')
         rest_client.executions.start.assert_called_with(a='b')
 
+        # prune to profile
+        with patch("resource_management_plugin.tasks.manager",
+                   manager_mock):
+            with patch("resource_management_plugin.tasks.Engine",
+                       engine_gen):
+                tasks.execute_conditionally(ctx=_ctx,
+                                            execution_dict={'a': 'b'},
+                                            project_id='project_id',
+                                            profile_str='abc',
+                                            prune_to_profile=True)
+        engine.limit_to_profile.assert_called_with('project_id', 'abc')
+
 
 if __name__ == '__main__':
     unittest.main()
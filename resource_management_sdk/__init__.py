@@ -1,17 +1,44 @@
 from cloudify.exceptions import NonRecoverableError
 
+from constants import NODE_TYPE_RESULT
 from context import ResourceManagementContext
 from handle import (
+    BatchExecutionResultUsageHandler,
+    BatchExecutionStartUsageHandler,
+    ConcurrentExecutionResultUsageHandler,
+    ConcurrentExecutionStartUsageHandler,
     ExecutionResultUsageHandler,
     ExecutionStartUsageHandler,
+    HandlerDispatcher,
     NoopHandler,
     OpenstackQuotaHandler,
     ProjectHandler,
     ResultHandler,
     SimpleQuotaHandler,
-    SimpleUsageHandler)
+    SimpleUsageHandler,
+    WindowedExecutionResultUsageHandler,
+    WindowedExecutionStartUsageHandler)
 from profile import ResourcesProfile
 
+
+class Pipeline(list):
+    """Handler chain processed by Engine in one pass over instances - each
+    instance goes through all stages (sub-chains) at once. Stages listed as
+    barriers are run only after all instances passed previous stages.
+
+    Attributes:
+        barriers: set of barrier stages indexes"""
+
+    def __init__(self, stages, barriers=()):
+        """Class constructor.
+
+        Args:
+            stages: list of stages (handlers lists)
+            barriers: optional, indexes of barrier stages"""
+        super(Pipeline, self).__init__(stages)
+        self.barriers = set(barriers)
+
+
 SIMPLE_HANDLER_CHAIN = [
     [
         NoopHandler,
@@ -44,13 +71,83 @@ PARALLEL_EXECUTIONS_HANDLER_CHAIN = [
     ]
 ]
 
+# project resolve, execution start and quota read are done in one pass,
+# usages results are waited for when all executions are started
+PARALLEL_EXECUTIONS_PIPELINE = Pipeline(
+    PARALLEL_EXECUTIONS_HANDLER_CHAIN,
+    barriers=[3, 4]
+)
+
+BATCH_EXECUTIONS_HANDLER_CHAIN = [
+    [
+        ProjectHandler
+    ],
+    [
+        BatchExecutionStartUsageHandler
+    ],
+    [
+        OpenstackQuotaHandler,
+        SimpleQuotaHandler
+    ],
+    [
+        BatchExecutionResultUsageHandler
+    ],
+    [
+        ResultHandler
+    ]
+]
+
+WINDOWED_EXECUTIONS_HANDLER_CHAIN = [
+    [
+        ProjectHandler
+    ],
+    [
+        WindowedExecutionStartUsageHandler
+    ],
+    [
+        OpenstackQuotaHandler,
+        SimpleQuotaHandler
+    ],
+    [
+        WindowedExecutionResultUsageHandler
+    ],
+    [
+        ResultHandler
+    ]
+]
+
+CONCURRENT_EXECUTIONS_HANDLER_CHAIN = [
+    [
+        ProjectHandler
+    ],
+    [
+        ConcurrentExecutionStartUsageHandler
+    ],
+    [
+        OpenstackQuotaHandler,
+        SimpleQuotaHandler
+    ],
+    [
+        ConcurrentExecutionResultUsageHandler
+    ],
+    [
+        ResultHandler
+    ]
+]
+
 SIMPLE_MODE_KEYWORD = 'simple'
 PARALLEL_MODE_KEYWORD = 'parallel'
+BATCH_MODE_KEYWORD = 'batch'
+WINDOWED_MODE_KEYWORD = 'windowed'
+CONCURRENT_MODE_KEYWORD = 'concurrent'
 DEFAULT_MODE = SIMPLE_MODE_KEYWORD
 
 MODES = {
     SIMPLE_MODE_KEYWORD: SIMPLE_HANDLER_CHAIN,
-    PARALLEL_MODE_KEYWORD: PARALLEL_EXECUTIONS_HANDLER_CHAIN
+    PARALLEL_MODE_KEYWORD: PARALLEL_EXECUTIONS_PIPELINE,
+    BATCH_MODE_KEYWORD: BATCH_EXECUTIONS_HANDLER_CHAIN,
+    WINDOWED_MODE_KEYWORD: WINDOWED_EXECUTIONS_HANDLER_CHAIN,
+    CONCURRENT_MODE_KEYWORD: CONCURRENT_EXECUTIONS_HANDLER_CHAIN
 }
 
 
@@ -62,15 +159,20 @@ class Engine(object):
         rest_client: rest client instance
         rsm_ctx: resource management context instance"""
 
-    def __init__(self, ctx, rest_client):
+    def __init__(self, ctx, rest_client, **kwargs):
         """Class constructor.
 
         Args:
             ctx: cloudify context instance
-            rest_client: rest client instance"""
+            rest_client: rest client instance
+            **kwargs: kwargs for ResourceManagementContext"""
         self.logger = ctx.logger
         self.rest_client = rest_client
-        self.rsm_ctx = ResourceManagementContext(ctx, self.rest_client)
+        self.rsm_ctx = ResourceManagementContext(
+            ctx,
+            self.rest_client,
+            **kwargs
+        )
 
     def _get_profile(self, profile_str):
         """Convert requirements dictionary to profile.
@@ -107,6 +209,13 @@ class Engine(object):
 
     def _report_data(self):
         """Dump collected data to logs"""
+        if self.rsm_ctx.saved_executions:
+            self.logger.info(
+                'Executions saved by sharing results between equivalent '
+                'usage node instances: {}'
+                .format(self.rsm_ctx.saved_executions)
+            )
+
         self.logger.info(
             '\nCalculated resources availabilities: \n{}'
             .format(
@@ -151,6 +260,84 @@ class Engine(object):
                 'Profile validation ended successfully - no issues found !'
             )
 
+    def limit_to_profile(self, project_id, profile_str):
+        """Collect only resources required by profile - instances which
+        cannot provide them (and not related projects) are skipped.
+
+        Args:
+            project_id: project id
+            profile_str: profile as string"""
+        profile = self._get_profile(profile_str)
+        self.rsm_ctx.set_required_resources(
+            profile.get_resource_keys(project_id)
+        )
+
+    def enable_fail_fast(self, project_id, profile_str):
+        """Validate profile during collection - run is stopped (and started
+        executions are cancelled) as soon as any requirement is not met.
+
+        Args:
+            project_id: project id
+            profile_str: profile as string"""
+        profile = self._get_profile(profile_str)
+        self.rsm_ctx.set_fail_fast_profile(profile, project_id)
+
+    def _fail(self, errors):
+        """Stop run because of unmet requirements - cancel started
+        executions and report errors.
+
+        Args:
+            errors: list errors found during collection
+
+        Raises:
+            NonRecoverableError: always."""
+        cancelled = self.rsm_ctx.cancel_executions()
+        self.logger.info(
+            'Requirement not met - stopping collection '
+            '(cancelled executions: {})'.format(cancelled)
+        )
+
+        # result instances are registered by ResultHandler at the end of
+        # run - not reached yet
+        for instance_id in self.rsm_ctx.get_instance_ids(NODE_TYPE_RESULT):
+            self.rsm_ctx.add_result_instance_id(instance_id)
+
+        self._set_result_as_runtime_properties(errors)
+        self._report_result(errors)
+
+    def _get_dispatcher(self, handler_chain):
+        """Create handlers from chain and dispatcher selecting them by
+        node type.
+
+        Args:
+            handler_chain: list handlers classes
+
+        Returns:
+            HandlerDispatcher instance"""
+        return HandlerDispatcher(
+            [handler_cls(self.logger) for handler_cls in handler_chain]
+        )
+
+    def _handle(self, handler):
+        """Run handler for current instance.
+
+        Args:
+            handler: handler instance
+
+        Raises:
+            NonRecoverableError: requirement not met (fail fast mode)."""
+        # instances which cannot provide resources required by profile
+        # (see limit_to_profile) are skipped
+        if not self.rsm_ctx.is_required():
+            return
+
+        self.logger.info('HANDLER {} start'.format(handler.__class__))
+        handler.handle(self.rsm_ctx)
+        self.logger.info('HANDLER {} end'.format(handler.__class__))
+
+        if self.rsm_ctx.failed_requirements:
+            self._fail(self.rsm_ctx.failed_requirements)
+
     def _run(self, handler_chain, report=True):
         """Run handlers over instances attached to context.
 
@@ -160,24 +347,74 @@ class Engine(object):
 
         Raises:
             NonRecoverableError: if validation errors list is not empty."""
-        self.rsm_ctx.reset()
-        handlers = [handler_cls(self.logger) for handler_cls in handler_chain]
+        instance = self.rsm_ctx.reset()
+        dispatcher = self._get_dispatcher(handler_chain)
+
+        while instance:
+            handler = dispatcher.get_handler(self.rsm_ctx)
+
+            if handler:
+                self._handle(handler)
+
+            instance = self.rsm_ctx.next_instance()
+
+        if report:
+            self._report_data()
+
+    def _run_stages(self, stages, barriers, queues, first_stage):
+        """Move current instance through pipeline stages till the end or
+        till next barrier stage.
+
+        Args:
+            stages: list of stages (HandlerDispatcher instances)
+            barriers: indexes of barrier stages
+            queues: positions of instances waiting for barrier stage, as key
+                used barrier stage index
+            first_stage: index of stage to start from"""
+        for index in range(first_stage, len(stages)):
+            handler = stages[index].get_handler(self.rsm_ctx)
+
+            if index in barriers and index != first_stage:
+                # wait for barrier only if instance has anything left to do
+                if handler or any(stage.get_handler(self.rsm_ctx)
+                                  for stage in stages[index + 1:]):
+                    queues[index].append(self.rsm_ctx.position)
+
+                return
+
+            if handler:
+                self._handle(handler)
+
+    def run_pipeline(self, pipeline, report=True):
+        """Run handlers pipeline in one pass over instances attached to
+        context. Instances added during the pass (e.g. by project
+        resolution) are processed in the same pass.
+
+        Args:
+            pipeline: Pipeline instance
+            report: raise error if any errors found
+
+        Raises:
+            NonRecoverableError: if validation errors list is not empty."""
+        self.logger.info(
+            '\n\n\n---------------------------\n\n'
+            'Running rsm-plugin engine for handlers pipeline: {}'
+            '\n\n---------------------------\n\n\n'
+            .format(pipeline)
+        )
 
-        while True:
-            for handler in handlers:
-                if handler.can_handle(self.rsm_ctx):
-                    self.logger.info(
-                        'HANDLER {} start'.format(handler.__class__)
-                    )
-                    handler.handle(self.rsm_ctx)
-                    self.logger.info(
-                        'HANDLER {} end'.format(handler.__class__)
-                    )
+        stages = [self._get_dispatcher(stage) for stage in pipeline]
+        queues = dict((index, []) for index in pipeline.barriers)
+        instance = self.rsm_ctx.reset()
 
-                    break
+        while instance:
+            self._run_stages(stages, pipeline.barriers, queues, 0)
+            instance = self.rsm_ctx.next_instance()
 
-            if not self.rsm_ctx.next_instance():
-                break
+        for index in sorted(queues.keys()):
+            for position in queues[index]:
+                self.rsm_ctx.select_instance(position)
+                self._run_stages(stages, pipeline.barriers, queues, index)
 
         if report:
             self._report_data()
@@ -186,11 +423,15 @@ class Engine(object):
         """Run handlers over instances attached to context.
 
         Args:
-            handler_chains: list handler_chains for run
+            handler_chains: list handler_chains for run, Pipeline instance
+                is processed by run_pipeline
             report: raise error if any errors found
 
         Raises:
             NonRecoverableError: if validation errors list is not empty."""
+        if isinstance(handler_chains, Pipeline):
+            return self.run_pipeline(handler_chains, report)
+
         for handler_chain in handler_chains:
             if type(handler_chain) not in set([list, tuple]):
                 handler_chain = [handler_chain]
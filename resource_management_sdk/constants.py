@@ -1,10 +1,23 @@
 DEFAULT_OPERATION_NAME = 'list'
+DEFAULT_PAGE_SIZE = 1000
+# max number of ids in one list request filter (ids are sent in query string)
+ID_FILTER_SIZE = 100
+
+EXECUTION_FIELDS = ['id', 'status']
+NODE_FIELDS = ['id', 'type_hierarchy', 'properties']
+NODE_INSTANCE_FIELDS = ['id', 'node_id', 'deployment_id', 'runtime_properties']
 
 NODE_TYPE_PROJECT = 'cloudify.nodes.resource_management.Project'
 NODE_TYPE_ROOT = 'cloudify.nodes.Root'
 NODE_TYPE_QUOTA = 'cloudify.nodes.resource_management.Quota'
 NODE_TYPE_USAGE = 'cloudify.nodes.resource_management.Usage'
 NODE_TYPE_RESULT = 'cloudify.nodes.resource_management.Result'
+NODE_TYPES = [
+    NODE_TYPE_PROJECT,
+    NODE_TYPE_QUOTA,
+    NODE_TYPE_USAGE,
+    NODE_TYPE_RESULT
+]
 
 PROPERTY_DEPLOYMENT_ID = 'deployment_id'
 PROPERTY_OPERATION_INPUTS = 'operation_inputs'
@@ -14,6 +27,9 @@ PROPERTY_RUNTIME_PROPERTY_NAME = 'runtime_property_name'
 PROPERTY_SCOPE = 'scope'
 PROPERTY_SYSTEM_NAME = 'system_name'
 
+RUNTIME_PROPERTY_CACHE = 'resource_management_cache'
+RUNTIME_PROPERTY_DURATIONS = 'execution_durations'
+
 SCOPE_GLOBAL = 'global'
 SCOPE_PROJECT = 'project'
 SCOPES = [SCOPE_GLOBAL, SCOPE_PROJECT]
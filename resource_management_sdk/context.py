@@ -1,10 +1,22 @@
 import collections
+import functools
+import json
+import time
+from multiprocessing.pool import ThreadPool
 
 from .constants import (
     DEFAULT_OPERATION_NAME,
+    DEFAULT_PAGE_SIZE,
+    NODE_TYPE_PROJECT,
+    NODE_TYPE_QUOTA,
+    NODE_TYPE_RESULT,
+    NODE_TYPE_USAGE,
     PROPERTY_DEPLOYMENT_ID,
     PROPERTY_OPERATION_INPUTS,
-    PROPERTY_PROJECT_NAME
+    PROPERTY_PROJECT_NAME,
+    RUNTIME_PROPERTY_CACHE,
+    RUNTIME_PROPERTY_DURATIONS,
+    SCOPE_GLOBAL
 )
 from .data import (
     ResourceAvailability,
@@ -16,6 +28,7 @@ from .instance import (
     RestClientInstanceAdapter,
     WorkflowCtxInstanceAdapter
 )
+from .profile import ResourcesProfile
 
 
 class ResourceManagementContext(object):
@@ -26,29 +39,178 @@ class ResourceManagementContext(object):
         rest_client: rest client instance
         execution_runner: ExecutionRunner instance
         _collected_data: collected data
+        _data_version: collected data version - changed on each update
+        _views: cached views of collected data, as key used view name
+        _project_index: collected data indexed by project, system and
+            resource name
+        _indexed_data: collected data dictionary covered by _project_index
         _instances: list instances
-        _result_instance_ids: list instances ids"""
-
-    def __init__(self, ctx, rest_client):
+        _result_instance_ids: list instances ids
+        _fail_fast_requirements: requirement values checked as soon as
+            availability is calculated, as key used resource key
+        _failed_requirements: errors found by fail fast validation
+        _required_resources: names of resources required by profile,
+            grouped by project and system name (None - all resources
+            are collected)
+        _budget_exhausted: True, if workflow time budget is exhausted and
+            executions left running were cancelled
+        _project_workers: number of threads used for loading projects
+        _project_instances: prefetched instances by project deployment id
+        _loaded_deployment_ids: set of already loaded deployment ids
+        _page_size: number of node instances requested in one call
+        _batch_size: max number of node instances in one batch execution
+        _batches: batch executions information by node instance id
+        _max_in_flight: max number of running executions in windowed mode
+        _in_flight: node instance ids of running executions in windowed
+            mode, as key used execution id
+        _window_results: results of finished executions in windowed mode,
+            as key used node instance id
+        _timed_out_executions: ids of executions not tracked anymore after
+            timeout in windowed mode
+        _schedule: positions of usage instances in execution start order
+            (longest expected execution first) in windowed mode
+        _started_positions: positions of usage instances with started
+            execution in windowed mode
+        _execution_workers: number of threads used for REST calls
+            in concurrent mode
+        _execution_pool: thread pool used in concurrent mode
+        _execution_starts: pending execution starts in concurrent mode,
+            as key used node instance id
+        _execution_results: pending results fetching in concurrent mode,
+            as key used node instance id
+        _max_age: max age (in seconds) of execution result which can be
+            reused instead of running new execution, 0 - no reuse
+        _cached_results: reused execution results, as key used node
+            instance id
+        _shared_executions: execution id (in concurrent mode start of
+            execution till its id is known) and node instance id of
+            execution shared by equivalent global scope usage instances,
+            as key used execution signature
+        _shared_results: results of shared executions, as key used
+            execution signature
+        _shared_cached_results: node instance id and reused result of
+            previous execution shared by equivalent global scope usage
+            instances, as key used execution signature
+        _saved_executions: number of executions not started thanks to
+            sharing"""
+
+    DEFAULT_PROJECT_WORKERS = 10
+    DEFAULT_BATCH_SIZE = 50
+    DEFAULT_MAX_IN_FLIGHT = 20
+    DEFAULT_EXECUTION_WORKERS = 10
+    DEFAULT_MAX_AGE = 0
+
+    def __init__(self, ctx, rest_client, **kwargs):
         """Class constructor.
 
         Args:
             ctx: cloudify context instance
-            rest_client: rest client instance"""
+            rest_client: rest client instance
+            project_workers: optional, number of threads used for
+                concurrent loading of project deployments (first page of
+                instances is prefetched for this number of next deployments),
+                1 means that project instances are streamed page by page
+                without prefetch
+            page_size: optional, number of node instances requested in one
+                call during project deployment loading
+            batch_size: optional, max number of node instances handled
+                by one execution in batch mode
+            max_in_flight: optional, max number of running executions
+                in windowed mode
+            execution_workers: optional, number of threads used for starting
+                executions and getting their results in concurrent mode
+            max_age: optional, max age (in seconds) of previous execution
+                result which is reused instead of running new execution
+            **kwargs: kwargs for ExecutionRunner"""
         self.logger = ctx.logger
         self.rest_client = rest_client
-        self.execution_runner = ExecutionRunner(self.log, rest_client)
+        self.execution_runner = ExecutionRunner(
+            self.log,
+            rest_client,
+            **kwargs
+        )
+        self._budget_exhausted = False
+
+        self._project_workers = max(
+            int(kwargs.get('project_workers', self.DEFAULT_PROJECT_WORKERS)),
+            1
+        )
+        self._project_instances = {}
+        self._loaded_deployment_ids = set()
+        self._page_size = max(
+            int(kwargs.get('page_size', DEFAULT_PAGE_SIZE)),
+            1
+        )
+        self._batch_size = max(
+            int(kwargs.get('batch_size', self.DEFAULT_BATCH_SIZE)),
+            1
+        )
+        self._batches = {}
+        self._max_in_flight = max(
+            int(kwargs.get('max_in_flight', self.DEFAULT_MAX_IN_FLIGHT)),
+            1
+        )
+        self._in_flight = collections.OrderedDict()
+        self._window_results = {}
+        self._timed_out_executions = set()
+        self._schedule = None
+        self._started_positions = set()
+        self._execution_workers = max(
+            int(kwargs.get('execution_workers',
+                           self.DEFAULT_EXECUTION_WORKERS)),
+            1
+        )
+        self._execution_pool = None
+        self._execution_starts = {}
+        self._execution_results = {}
+        self._max_age = float(kwargs.get('max_age', self.DEFAULT_MAX_AGE))
+        self._cached_results = {}
+        self._shared_executions = {}
+        self._shared_results = {}
+        self._shared_cached_results = {}
+        self._saved_executions = 0
 
         self._collected_data = {}
+        self._data_version = 0
+        self._views = {}
+        self._project_index = {}
+        self._indexed_data = self._collected_data
         self._instances = Instances(
             ctx.logger,
             WorkflowCtxInstanceAdapter.get_instances(ctx)
         )
         self._result_instance_ids = []
+        self._load_execution_durations()
+        self._required_resources = None
+        self._fail_fast_requirements = {}
+        self._failed_requirements = []
 
-    @property
-    def collected_data(self):
-        """Return currently collected data.
+    def _get_view(self, name, build_method):
+        """Get cached view of collected data - view is built again only if
+        collected data changed.
+
+        Args:
+            name: view name
+            build_method: method building view
+
+        Returns:
+            view of collected data"""
+        cached = self._views.get(name, None)
+
+        if cached is None or \
+                cached[0] != self._data_version or \
+                cached[1] is not self._collected_data:
+            cached = (
+                self._data_version,
+                self._collected_data,
+                build_method()
+            )
+            self._views[name] = cached
+
+        return cached[2]
+
+    def _build_collected_data(self):
+        """Build collected data view with calculated availability only.
 
         Returns:
             dictionary with collected data, as key used resource key."""
@@ -60,28 +222,101 @@ class ResourceManagementContext(object):
 
         return result
 
-    @property
-    def collected_data_dict(self):
-        """Return currently collected data.
+    def _add_to_project_index(self, resource_key, resource_data):
+        """Add collected data to project index.
+
+        Args:
+            resource_key: resource key
+            resource_data: ResourceAvailability instance"""
+        project_data = self._project_index.setdefault(
+            resource_key.project_id or resource_key.scope,
+            {}
+        )
+        system_data = project_data.setdefault(resource_key.system_name, {})
+        system_data[resource_key.resource_name] = resource_data
+
+    def _get_project_index(self):
+        """Get collected data indexed by project, system and resource name.
+        Index is built again only if collected data dictionary was replaced.
 
         Returns:
-            dictionary with collected data with merged resource keys."""
-        def merge(dst, src):
-            for k, v in src.iteritems():
-                if k in dst and \
-                        isinstance(dst[k], dict) and \
-                        isinstance(src[k], collections.Mapping):
-                    merge(dst[k], src[k])
-                else:
-                    dst[k] = src[k]
+            dictionary like:
+                {
+                    <project>: {
+                        <system>: {
+                            <resource>: <ResourceAvailability>}}}"""
+        if self._indexed_data is not self._collected_data:
+            self._project_index = {}
+
+            for resource_key, resource_data in \
+                    self._collected_data.iteritems():
+                self._add_to_project_index(resource_key, resource_data)
+
+            self._indexed_data = self._collected_data
+
+        return self._project_index
+
+    def _build_collected_data_dict(self):
+        """Build collected data view with merged resource keys.
 
+        Returns:
+            dictionary with collected data with merged resource keys."""
         result = {}
 
-        for resource_key, resource_data in self.collected_data.iteritems():
-            merge(result, resource_key.as_dict(resource_data.as_dict()))
+        for project, project_data in self._get_project_index().iteritems():
+            for system_name, system_data in project_data.iteritems():
+                for resource_name, resource_data in system_data.iteritems():
+                    if not resource_data.availability:
+                        continue
+
+                    result.setdefault(project, {}).setdefault(
+                        system_name,
+                        {}
+                    )[resource_name] = resource_data.as_dict()
 
         return result
 
+    def get_availability_data(self, resource_key):
+        """Get collected data for resource.
+
+        Args:
+            resource_key: resource key with project id
+
+        Returns:
+            ResourceAvailability instance or None if resource is not
+            collected"""
+        resource_data = self._get_project_index().get(
+            resource_key.project_id or resource_key.scope,
+            {}
+        ).get(
+            resource_key.system_name,
+            {}
+        ).get(
+            resource_key.resource_name,
+            None
+        )
+
+        return resource_data
+
+    @property
+    def collected_data(self):
+        """Return currently collected data.
+
+        Returns:
+            dictionary with collected data, as key used resource key."""
+        return self._get_view('collected_data', self._build_collected_data)
+
+    @property
+    def collected_data_dict(self):
+        """Return currently collected data.
+
+        Returns:
+            dictionary with collected data with merged resource keys."""
+        return self._get_view(
+            'collected_data_dict',
+            self._build_collected_data_dict
+        )
+
     @property
     def collected_data_raw(self):
         """Return currently collected data.
@@ -129,10 +364,184 @@ class ResourceManagementContext(object):
             self.project,
         )
 
-    def log(self, level, message, *args):
-        """Log message
+    def _load_execution_durations(self):
+        """Load execution durations saved by result instances in previous
+        runs."""
+        for instance in self._instances.instances:
+            if instance.type != NODE_TYPE_RESULT:
+                continue
+
+            durations = instance.runtime_properties.get(
+                RUNTIME_PROPERTY_DURATIONS,
+                None
+            )
+
+            if not isinstance(durations, dict):
+                continue
+
+            for node_id, duration in durations.iteritems():
+                self.execution_runner.durations.setdefault(
+                    node_id,
+                    float(duration)
+                )
+
+    @property
+    def execution_durations(self):
+        """Last observed execution durations.
+
+        Returns:
+            dictionary with durations (in seconds), as key used node id"""
+        return dict(self.execution_runner.durations)
+
+    def set_required_resources(self, resource_keys):
+        """Limit collection to given resources - project, quota and usage
+        instances not able to provide any of them are skipped.
+
+        Args:
+            resource_keys: list of resource keys with project id"""
+        self._required_resources = {}
+
+        for resource_key in resource_keys:
+            self._required_resources.setdefault(
+                resource_key.project_id or resource_key.scope,
+                {}
+            ).setdefault(
+                resource_key.system_name,
+                set()
+            ).add(resource_key.resource_name)
+
+        self.logger.info(
+            'Collecting only resources required by profile: {}'
+            .format(resource_keys)
+        )
+
+    def set_fail_fast_profile(self, profile, project_id):
+        """Validate profile requirements as soon as availability of required
+        resource is calculated.
+
+        Args:
+            profile: ResourcesProfile instance
+            project_id: project name for validate"""
+        self._fail_fast_requirements = profile.get_requirements(project_id)
+
+    @property
+    def failed_requirements(self):
+        """Errors found by fail fast validation.
+
+        Returns:
+            list of NoAvailableResourcesError"""
+        return list(self._failed_requirements)
+
+    def _check_requirement(self, resource_key):
+        """Check fail fast requirement for resource.
+
+        Args:
+            resource_key: resource key"""
+        requirement_value = self._fail_fast_requirements.get(
+            resource_key,
+            None
+        )
+        resource_data = self._collected_data[resource_key]
+
+        # wait till both quota and usage are collected - availability can be
+        # still undetermined then (e.g. unlimited quota)
+        if requirement_value is None or resource_data.quota is None or \
+                resource_data.usage is None:
+            return
+
+        error = ResourcesProfile.check_requirement(
+            resource_key,
+            requirement_value,
+            resource_data
+        )
+
+        if error:
+            self.log('warn', error.message)
+            self._failed_requirements.append(error)
+
+    def cancel_executions(self):
+        """Cancel all started and not finished executions - also these
+        scheduled for start in concurrent mode.
+
+        Returns:
+            list of cancelled execution ids"""
+        if self._execution_pool is not None:
+            # drop not started tasks and wait for running ones
+            self._execution_pool.terminate()
+            self._execution_pool.join()
+            self._execution_pool = None
+            self._execution_starts = {}
+            self._execution_results = {}
+
+        return self.execution_runner.cancel_pending()
+
+    def _check_time_budget(self):
+        """Check if execution can be started - after workflow time budget
+        is exhausted no execution is started and executions left running
+        are cancelled.
+
+        Returns:
+            True, if workflow time budget is not exhausted"""
+        if not self.execution_runner.is_expired():
+            return True
+
+        if not self._budget_exhausted:
+            self._budget_exhausted = True
+            self.log(
+                'error',
+                'Workflow time budget exhausted - cancelled executions: {}',
+                self.execution_runner.cancel_pending()
+            )
+
+        self.log(
+            'error',
+            'Workflow time budget exhausted - execution is not started, '
+            'result is undetermined !'
+        )
+        return False
+
+    def is_required(self, instance=None, project=None):
+        """Check if instance can provide any of required resources.
 
         Args:
+            instance: optional, instance for check, by default current one
+            project: optional, project of instance, by default current one
+
+        Returns:
+            True, if instance has to be processed"""
+        if self._required_resources is None:
+            return True
+
+        if instance is None:
+            instance = self.instance
+            project = self.project
+
+        if instance.type == NODE_TYPE_PROJECT:
+            return instance.properties.get(PROPERTY_PROJECT_NAME, None) \
+                in self._required_resources
+
+        if instance.type not in (NODE_TYPE_QUOTA, NODE_TYPE_USAGE):
+            return True
+
+        systems = self._required_resources.get(project, {})
+
+        if instance.system_name is None:
+            return bool(systems)
+
+        resources = systems.get(instance.system_name, None)
+
+        if resources is None:
+            return False
+
+        # instance without resource name can provide values for many resources
+        return instance.resource_name is None or \
+            instance.resource_name in resources
+
+    def _log(self, instance_id, level, message, *args):
+        """Log message for node instance
+
+        Args:
+            instance_id: node instance id
             level: log level
             message: text message
             *args: additional parameters"""
@@ -140,7 +549,16 @@ class ResourceManagementContext(object):
 
         if method:
             message = str(message).format(*args)
-            method('[{0}] {1}'.format(self.instance.id, message))
+            method('[{0}] {1}'.format(instance_id, message))
+
+    def log(self, level, message, *args):
+        """Log message for current instance
+
+        Args:
+            level: log level
+            message: text message
+            *args: additional parameters"""
+        self._log(self.instance.id, level, message, *args)
 
     def log_state(self):
         """Dump current state."""
@@ -166,6 +584,21 @@ class ResourceManagementContext(object):
 
         return instance
 
+    @property
+    def position(self):
+        """Position of current instance in process list."""
+        return self._instances.position
+
+    def select_instance(self, position):
+        """Make instance from given position current one.
+
+        Args:
+            position: position in process list
+
+        Returns:
+            selected instance"""
+        return self._instances.select(position)
+
     def reset(self):
         """Reset state to initial
 
@@ -177,6 +610,101 @@ class ResourceManagementContext(object):
 
         return instance
 
+    def _load_project_instances(self, deployment_id):
+        """Load instances from project deployment.
+
+        Args:
+            deployment_id: project deployment id
+
+        Returns:
+            iterator of instances - only first page is loaded"""
+        return RestClientInstanceAdapter.prefetch_instances(
+            self.rest_client,
+            deployment_id,
+            self._page_size
+        )
+
+    def prefetch_projects(self):
+        """Load first page of instances for next not yet loaded project
+        deployments concurrently (one deployment per worker).
+
+        Deployment ids are taken from project instances known by context.
+        Loaded instances are stored and used by resolve_project later.
+
+        Returns:
+            list of prefetched deployment ids"""
+        deployment_ids = []
+
+        for instance in self._instances.instances:
+            if instance.type != NODE_TYPE_PROJECT or \
+                    not self.is_required(instance):
+                continue
+
+            deployment_id = instance.properties.get(
+                PROPERTY_DEPLOYMENT_ID,
+                None
+            )
+
+            if deployment_id and \
+                    deployment_id not in self._loaded_deployment_ids and \
+                    deployment_id not in deployment_ids:
+                deployment_ids.append(deployment_id)
+
+                if len(deployment_ids) >= self._project_workers:
+                    break
+
+        if not deployment_ids:
+            return deployment_ids
+
+        workers = len(deployment_ids)
+        self.logger.info(
+            'Prefetching node_instances of {0} project deployments '
+            '(using {1} workers)'
+            .format(len(deployment_ids), workers)
+        )
+
+        if workers > 1:
+            pool = ThreadPool(workers)
+
+            try:
+                results = pool.map(self._load_project_instances,
+                                   deployment_ids)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = map(self._load_project_instances, deployment_ids)
+
+        for deployment_id, instances in zip(deployment_ids, results):
+            self._project_instances[deployment_id] = instances
+            self._loaded_deployment_ids.add(deployment_id)
+
+        return deployment_ids
+
+    def _get_project_instances(self, deployment_id):
+        """Get instances for project deployment - prefetched if possible.
+
+        Args:
+            deployment_id: project deployment id
+
+        Returns:
+            iterable with instances"""
+        if self._project_workers > 1 and \
+                deployment_id not in self._loaded_deployment_ids:
+            self.prefetch_projects()
+
+        if deployment_id in self._project_instances:
+            return self._project_instances.pop(deployment_id)
+
+        # no prefetch, deployment already used by other project
+        # or not known by context - stream instances page by page
+        self._loaded_deployment_ids.add(deployment_id)
+        return RestClientInstanceAdapter.iter_instances(
+            self.rest_client,
+            deployment_id,
+            self._page_size
+        )
+
     def resolve_project(self):
         """Select instances related to project.
 
@@ -205,12 +733,10 @@ class ResourceManagementContext(object):
 
             return False
 
-        instances = RestClientInstanceAdapter.get_instances(
-            self.rest_client,
-            deployment_id
+        instances_count = self._instances.add_project(
+            project_name,
+            self._get_project_instances(deployment_id)
         )
-
-        self._instances.add_project(project_name, instances)
         self.logger.info(
             'Project {0} (deployment_id={1}) defined by node_instance {2} '
             'in parent deployment resolved successfully '
@@ -219,12 +745,192 @@ class ResourceManagementContext(object):
                 project_name,
                 deployment_id,
                 self.instance.id,
-                len(instances)
+                instances_count
             )
         )
 
         return True
 
+    def get_cached_result(self):
+        """Get result of previous execution for current instance - if it
+        is not older than max_age and has been run with the same operation
+        inputs. Fresh result reused by equivalent instance is used too.
+
+        Returns:
+            runtime properties or None if there is no fresh result"""
+        if self.instance.id in self._cached_results:
+            return self._cached_results[self.instance.id]
+
+        signature = self._get_execution_signature()
+        runtime_properties = self._get_fresh_runtime_properties()
+
+        if runtime_properties is not None:
+            if signature is not None:
+                self._shared_cached_results.setdefault(
+                    signature,
+                    (self.instance.id, runtime_properties)
+                )
+        elif signature in self._shared_cached_results:
+            instance_id, runtime_properties = \
+                self._shared_cached_results[signature]
+            self._saved_executions += 1
+            self.log(
+                'info',
+                'Execution skipped - using result reused by equivalent '
+                'node instance {}',
+                instance_id
+            )
+        else:
+            return None
+
+        self._cached_results[self.instance.id] = runtime_properties
+        return runtime_properties
+
+    def _has_cached_result(self, position):
+        """Check if instance from given position has fresh result of
+        previous execution (see get_cached_result).
+
+        Args:
+            position: position in process list
+
+        Returns:
+            True, if execution is not needed for instance"""
+        if self._max_age <= 0:
+            return False
+
+        current_position = self.position
+        self.select_instance(position)
+
+        try:
+            return self.get_cached_result() is not None
+        finally:
+            self.select_instance(current_position)
+
+    def _get_fresh_runtime_properties(self):
+        """Get runtime properties of current instance if they contain
+        result of previous execution not older than max_age and run with
+        the same operation inputs.
+
+        Returns:
+            runtime properties or None if there is no fresh result"""
+        if self._max_age <= 0:
+            return None
+
+        runtime_properties = self.instance.runtime_properties
+        cache = runtime_properties.get(RUNTIME_PROPERTY_CACHE, None)
+
+        if not isinstance(cache, dict) or \
+                cache.get('operation_inputs', None) != \
+                self.instance.properties.get(PROPERTY_OPERATION_INPUTS, {}):
+            return None
+
+        age = time.time() - cache.get('timestamp', 0)
+
+        if age > self._max_age:
+            return None
+
+        self.log(
+            'info',
+            'Reusing result of execution finished {0:.0f} seconds ago',
+            age
+        )
+        return runtime_properties
+
+    def _save_result(self, result):
+        """Mark execution result in runtime properties of current instance
+        with timestamp, so it can be reused by next runs.
+
+        Args:
+            result: runtime properties got after execution"""
+        if self._max_age <= 0 or not result:
+            return
+
+        runtime_properties = dict(result)
+        runtime_properties[RUNTIME_PROPERTY_CACHE] = {
+            'timestamp': time.time(),
+            'operation_inputs': self.instance.properties.get(
+                PROPERTY_OPERATION_INPUTS,
+                {}
+            )
+        }
+        self.set_runtime_properties(runtime_properties)
+
+    @property
+    def saved_executions(self):
+        """Number of executions not started thanks to sharing results
+        between equivalent usage instances."""
+        return self._saved_executions
+
+    def _get_execution_signature(self):
+        """Get signature of execution for current instance - global scope
+        usage instances with the same signature (e.g. copied to several
+        project blueprints) get the same result, so execution can be run
+        once for all of them.
+
+        Returns:
+            tuple or None if execution cannot be shared"""
+        instance = self.instance
+
+        if instance.type != NODE_TYPE_USAGE or instance.scope != SCOPE_GLOBAL:
+            return None
+
+        return (
+            instance.system_name,
+            instance.resource_name,
+            instance.runtime_property_name,
+            json.dumps(
+                instance.properties.get(PROPERTY_OPERATION_INPUTS, {}),
+                sort_keys=True
+            )
+        )
+
+    def _wait_for_result(self, execution_id):
+        """Wait for result of execution run for current instance (or for
+        equivalent one).
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            Result of execution"""
+        if execution_id is None:
+            # not started - workflow time budget exhausted
+            return {}
+
+        if execution_id in self._timed_out_executions:
+            self.log(
+                'error',
+                'Execution {} not finished before timeout - result is '
+                'undetermined !',
+                execution_id
+            )
+            return {}
+
+        signature = self._get_execution_signature()
+        shared_execution_id, instance_id = self._shared_executions.get(
+            signature,
+            (execution_id, self.instance.id)
+        )
+
+        if shared_execution_id != execution_id:
+            instance_id = self.instance.id
+
+        if signature in self._shared_results:
+            result = self._shared_results[signature]
+        else:
+            result = self.execution_runner.wait_for_result(
+                execution_id,
+                instance_id
+            )
+
+            if signature is not None:
+                self._shared_results[signature] = result
+
+        if instance_id == self.instance.id:
+            self._save_result(result)
+
+        return result
+
     def run_execution(self, operation_name=DEFAULT_OPERATION_NAME, wait=True):
         """Run execution
 
@@ -236,38 +942,533 @@ class ResourceManagementContext(object):
         Returns:
             If wait == True, returns executions results,
             otherwise - execution_id."""
-        execution_id = self.execution_runner.run(
+        execution_id = self._run_shared_execution(
+            self._start_execution,
+            operation_name
+        )
+        self.instance.set_execution_id(execution_id)
+
+        if wait:
+            result = self._wait_for_result(execution_id)
+            self.instance.set_execution_id()
+            return result
+
+        return execution_id
+
+    def _run_shared_execution(self, start_method, operation_name):
+        """Start execution for current instance - execution is skipped if
+        it was already started for equivalent instance.
+
+        Args:
+            start_method: method starting execution for current instance,
+                gets operation name and returns execution id or None if
+                execution was not started
+            operation_name: operation name for run
+
+        Returns:
+            execution id (also of execution started for equivalent
+            instance) or None, if execution was not started"""
+        signature = self._get_execution_signature()
+
+        if signature in self._shared_executions:
+            execution_id, instance_id = self._shared_executions[signature]
+            self._saved_executions += 1
+            self.log(
+                'info',
+                'Execution skipped - using result of execution run for '
+                'equivalent node instance {}',
+                instance_id
+            )
+            return execution_id
+
+        execution_id = start_method(operation_name)
+
+        if signature is not None and execution_id is not None:
+            self._shared_executions[signature] = (
+                execution_id,
+                self.instance.id
+            )
+
+        return execution_id
+
+    def _start_execution(self, operation_name):
+        """Start execution for current instance.
+
+        Args:
+            operation_name: operation name for run
+
+        Returns:
+            execution_id or None, if workflow time budget is exhausted."""
+        if not self._check_time_budget():
+            return None
+
+        return self.execution_runner.run(
             self.instance.deployment_id,
             self.instance.id,
             operation_name,
             self.instance.properties.get(
                 PROPERTY_OPERATION_INPUTS,
                 {}
-            )
+            ),
+            node_id=self.instance.node_id
         )
 
-        self.instance.set_execution_id(execution_id)
+    def _prepare_batches(self):
+        """Group not yet batched usage instances by deployment and operation
+        inputs into batches limited by batch size. Instances with fresh
+        result of previous execution are skipped."""
+        batches = collections.OrderedDict()
+
+        for position, (instance, project) in \
+                enumerate(self._instances.iter_instances()):
+            if instance.type != NODE_TYPE_USAGE or \
+                    instance.id in self._batches or \
+                    not self.is_required(instance, project) or \
+                    self._has_cached_result(position):
+                continue
+
+            batch_key = (
+                instance.deployment_id,
+                json.dumps(
+                    instance.properties.get(PROPERTY_OPERATION_INPUTS, {}),
+                    sort_keys=True
+                )
+            )
+            batch = batches.get(batch_key, None)
 
-        if wait:
-            result = self.execution_runner.wait_for_result(
-                execution_id,
-                self.instance.id
+            if batch is None or len(batch['instances']) >= self._batch_size:
+                batch = {
+                    'instances': [],
+                    'execution_id': None,
+                    'results': None
+                }
+                batches[batch_key] = batch
+
+            batch['instances'].append(instance)
+            self._batches[instance.id] = batch
+
+    def _get_batch(self):
+        """Get batch for current instance.
+
+        Returns:
+            dictionary with batch information"""
+        if self.instance.id not in self._batches:
+            self._prepare_batches()
+
+        return self._batches[self.instance.id]
+
+    def run_batch_execution(self, operation_name=DEFAULT_OPERATION_NAME):
+        """Run execution for batch of instances containing current instance.
+
+        Execution is started only once for whole batch - by the first
+        instance from batch.
+
+        Args:
+            operation_name: optional, operation name for run,
+                by default DEFAULT_OPERATION_NAME
+
+        Returns:
+            execution_id or None, if workflow time budget is exhausted."""
+        batch = self._get_batch()
+
+        if batch['execution_id'] is None and self._check_time_budget():
+            batch['execution_id'] = self.execution_runner.run_batch(
+                self.instance.deployment_id,
+                [instance.id for instance in batch['instances']],
+                operation_name,
+                self.instance.properties.get(
+                    PROPERTY_OPERATION_INPUTS,
+                    {}
+                )
             )
 
-            self.instance.set_execution_id()
-            return result
+        self.instance.set_execution_id(batch['execution_id'])
+        return batch['execution_id']
+
+    def get_batch_execution_result(self):
+        """Wait for batch execution and return results for current instance.
+
+        Results for whole batch are gathered only once.
+
+        Returns:
+            Result of execution"""
+        batch = self._get_batch()
+
+        if batch['execution_id'] is None:
+            # not started - workflow time budget exhausted
+            batch['results'] = {}
+        elif batch['results'] is None:
+            batch['results'] = self.execution_runner.wait_for_results(
+                batch['execution_id'],
+                [instance.id for instance in batch['instances']]
+            )
+
+        self.instance.set_execution_id()
+        result = batch['results'].get(self.instance.id, {})
+        self._save_result(result)
+        return result
+
+    def _collect_finished_executions(self):
+        """Wait till at least one of running executions (windowed mode) is
+        finished and get results of all finished executions.
+
+        If no execution finished before timeout, the oldest one (running
+        longer than timeout) is not tracked anymore and its result is
+        undetermined - the execution is left running. When workflow time
+        budget is exhausted place in window is not freed anymore.
+
+        Returns:
+            True, if place in window was freed"""
+        finished = self.execution_runner.wait_for_any(
+            list(self._in_flight.keys())
+        )
+
+        if not finished:
+            if self.execution_runner.is_expired():
+                return False
+
+            execution_id, _ = self._in_flight.popitem(last=False)
+            self._timed_out_executions.add(execution_id)
+            return True
+
+        executions = dict(
+            (execution_id, self._in_flight.pop(execution_id))
+            for execution_id in finished
+        )
+        self._window_results.update(
+            self.execution_runner.get_results(executions)
+        )
+        return True
+
+    def _get_next_scheduled(self):
+        """Get position of next usage instance without started execution -
+        instances with the longest execution observed in previous runs are
+        first, instances with unknown duration go before all of them.
+        Instances with fresh result of previous execution are not scheduled.
+
+        Returns:
+            position in process list or None if all executions started"""
+        if self._schedule is None:
+            durations = self.execution_runner.durations
+            node_ids = {}
+
+            for position, (instance, project) in \
+                    enumerate(self._instances.iter_instances()):
+                if instance.type == NODE_TYPE_USAGE and \
+                        self.is_required(instance, project) and \
+                        not self._has_cached_result(position):
+                    node_ids[position] = instance.node_id
+
+            self._schedule = collections.deque(sorted(
+                node_ids.keys(),
+                key=lambda position: (
+                    -durations.get(node_ids[position], float('inf')),
+                    position
+                )
+            ))
+
+        while self._schedule:
+            position = self._schedule.popleft()
+
+            if position not in self._started_positions:
+                return position
+
+        return None
+
+    def run_windowed_execution(self, operation_name=DEFAULT_OPERATION_NAME):
+        """Run next execution (longest expected first) if number of running
+        executions is lower than max_in_flight, otherwise wait for finish
+        of any of them first. Each call starts one execution - all of them
+        are started when the method was called for all usage instances.
+        No execution is started after workflow time budget is exhausted.
+
+        Args:
+            operation_name: optional, operation name for run,
+                by default DEFAULT_OPERATION_NAME
+
+        Returns:
+            execution_id or None, if execution was not started."""
+        current_position = self.position
+        position = self._get_next_scheduled()
+
+        if position is None:
+            if current_position in self._started_positions:
+                return self.instance.execution_id
+
+            position = current_position
+
+        self.select_instance(position)
+
+        try:
+            # execution shared with equivalent instance is tracked only
+            # once and takes no place in window, its result is fetched for
+            # instance which has started it
+            shared = self._get_execution_signature() in self._shared_executions
+
+            while not shared and len(self._in_flight) >= self._max_in_flight:
+                # workflow time budget exhausted - execution is not started
+                if not self._collect_finished_executions():
+                    break
+
+            execution_id = self.run_execution(operation_name, wait=False)
+            self._started_positions.add(position)
+
+            if not shared and execution_id is not None:
+                self._in_flight[execution_id] = self.instance.id
+        finally:
+            self.select_instance(current_position)
 
         return execution_id
 
+    def get_windowed_execution_result(self):
+        """Return result of execution started by run_windowed_execution.
+        If it is still running, results of all executions which finish
+        in meantime are gathered too.
+
+        Returns:
+            Result of execution"""
+        execution_id = self.instance.execution_id
+
+        if execution_id is None:
+            # not started - workflow time budget exhausted
+            return {}
+
+        # results are collected for instances which have started executions
+        signature = self._get_execution_signature()
+        _, instance_id = self._shared_executions.get(
+            signature,
+            (execution_id, self.instance.id)
+        )
+
+        if instance_id not in self._window_results and \
+                execution_id in self._in_flight:
+            self._collect_finished_executions()
+
+        if instance_id in self._window_results:
+            result = self._window_results.pop(instance_id)
+
+            if signature is not None:
+                self._shared_results[signature] = result
+
+            if instance_id == self.instance.id:
+                self._save_result(result)
+        else:
+            # failed, timed out, still running or shared execution
+            self._in_flight.pop(execution_id, None)
+            result = self.get_execution_result()
+
+        self.instance.set_execution_id()
+        return result
+
+    def _get_execution_pool(self):
+        """Get thread pool for concurrent mode - created on first use.
+
+        Returns:
+            ThreadPool instance"""
+        if self._execution_pool is None:
+            self._execution_pool = ThreadPool(self._execution_workers)
+
+        return self._execution_pool
+
+    def _get_worker_runner(self, instance_id):
+        """Get execution runner for thread pool worker (concurrent mode) -
+        messages are logged for given node instance, not for current one.
+
+        Args:
+            instance_id: node instance id
+
+        Returns:
+            ExecutionRunner instance"""
+        return self.execution_runner.bind_logger(
+            functools.partial(self._log, instance_id)
+        )
+
+    def _close_execution_pool(self):
+        """Close thread pool for concurrent mode if nothing is pending."""
+        if self._execution_pool is None or \
+                self._execution_starts or \
+                self._execution_results:
+            return
+
+        self._execution_pool.close()
+        self._execution_pool.join()
+        self._execution_pool = None
+
+    def _submit_result(self, instance_id, execution_id):
+        """Schedule fetching of finished execution result in thread pool.
+
+        Args:
+            instance_id: node instance id
+            execution_id: execution id"""
+        self._execution_results[instance_id] = \
+            self._get_execution_pool().apply_async(
+                self._get_worker_runner(instance_id).wait_for_result,
+                (execution_id, instance_id)
+            )
+
+    def _submit_finished_results(self):
+        """Schedule fetching of results for all started and finished
+        executions (concurrent mode)."""
+        for instance_id, start in self._execution_starts.iteritems():
+            if instance_id in self._execution_results or \
+                    not start.ready() or \
+                    not start.successful():
+                continue
+
+            execution_id = start.get()
+
+            if self.execution_runner.is_finished(execution_id):
+                self._submit_result(instance_id, execution_id)
+
+    def _get_running_executions(self):
+        """Get ids of started and not finished executions (concurrent mode).
+
+        Returns:
+            list of execution ids"""
+        execution_ids = []
+
+        for instance_id, start in self._execution_starts.iteritems():
+            if instance_id in self._execution_results or \
+                    not start.ready() or \
+                    not start.successful():
+                continue
+
+            execution_id = start.get()
+
+            if not self.execution_runner.is_finished(execution_id):
+                execution_ids.append(execution_id)
+
+        return execution_ids
+
+    def _submit_start(self, operation_name):
+        """Schedule start of execution for current instance in thread pool.
+
+        Args:
+            operation_name: operation name for run
+
+        Returns:
+            start of execution (AsyncResult instance) or None, if workflow
+            time budget is exhausted"""
+        if not self._check_time_budget():
+            return None
+
+        start = self._get_execution_pool().apply_async(
+            self._get_worker_runner(self.instance.id).run,
+            (
+                self.instance.deployment_id,
+                self.instance.id,
+                operation_name,
+                self.instance.properties.get(
+                    PROPERTY_OPERATION_INPUTS,
+                    {}
+                )
+            ),
+            {'node_id': self.instance.node_id}
+        )
+        self._execution_starts[self.instance.id] = start
+        return start
+
+    def run_concurrent_execution(self, operation_name=DEFAULT_OPERATION_NAME):
+        """Schedule start of execution for current instance in thread pool
+        and return without waiting for REST call end. Execution is skipped
+        if it was already scheduled for equivalent instance.
+
+        Args:
+            operation_name: optional, operation name for run,
+                by default DEFAULT_OPERATION_NAME"""
+        self._run_shared_execution(self._submit_start, operation_name)
+
+    def _wait_for_concurrent_result(self, instance_id, signature):
+        """Wait for result of execution started in thread pool for node
+        instance. Results of other executions are fetched concurrently in
+        order in which executions finish.
+
+        Args:
+            instance_id: id of node instance which started execution
+            signature: execution signature
+
+        Returns:
+            Result of execution, empty dictionary if execution timed out"""
+        try:
+            try:
+                execution_id = self._execution_starts[instance_id].get()
+            except Exception:
+                # not started - nothing to share with equivalent instances
+                self._shared_executions.pop(signature, None)
+                raise
+
+            self.instance.set_execution_id(execution_id)
+
+            if signature is not None:
+                # execution id is known after start in thread pool
+                self._shared_executions[signature] = (
+                    execution_id,
+                    instance_id
+                )
+
+            while instance_id not in self._execution_results:
+                running = self._get_running_executions()
+
+                if execution_id in running and \
+                        not self.execution_runner.wait_for_any(running):
+                    break
+
+                self._submit_finished_results()
+
+            result = self._execution_results[instance_id].get() \
+                if instance_id in self._execution_results else {}
+        finally:
+            self._execution_starts.pop(instance_id, None)
+            self._execution_results.pop(instance_id, None)
+
+        if signature is not None:
+            self._shared_results[signature] = result
+
+        if instance_id == self.instance.id:
+            self._save_result(result)
+
+        return result
+
+    def get_concurrent_execution_result(self):
+        """Wait for execution started by run_concurrent_execution and return
+        its result. Results of all other finished executions are fetched
+        concurrently in meantime.
+
+        Returns:
+            Result of execution"""
+        signature = self._get_execution_signature()
+        _, instance_id = self._shared_executions.get(
+            signature,
+            (None, self.instance.id)
+        )
+
+        try:
+            if instance_id in self._execution_starts:
+                result = self._wait_for_concurrent_result(
+                    instance_id,
+                    signature
+                )
+            elif signature in self._shared_executions:
+                # result already fetched for equivalent instance
+                result = self._wait_for_result(
+                    self._shared_executions[signature][0]
+                )
+            else:
+                # not started - workflow time budget exhausted (or start
+                # failed for equivalent instance)
+                result = {}
+
+            return result
+        finally:
+            self.instance.set_execution_id()
+            self._close_execution_pool()
+
     def get_execution_result(self):
         """Wait and return executions results
 
         Returns:
             Result of execution"""
-        return self.execution_runner.wait_for_result(
-            self.instance.execution_id,
-            self.instance.id
-        )
+        return self._wait_for_result(self.instance.execution_id)
 
     def set_value(self, quota=None, usage=None, resource_name=None):
         """Set usage/quota values for collected data.
@@ -277,6 +1478,7 @@ class ResourceManagementContext(object):
             usage: optional, usage for set,
             resource_name: optional, resource name for set."""
         resource_key = self.get_resource_key(resource_name)
+        self._data_version += 1
 
         if resource_key in self._collected_data:
             self._collected_data[resource_key].update(
@@ -289,6 +1491,15 @@ class ResourceManagementContext(object):
                 usage=usage
             )
 
+            if self._indexed_data is self._collected_data:
+                self._add_to_project_index(
+                    resource_key,
+                    self._collected_data[resource_key]
+                )
+
+        if self._fail_fast_requirements:
+            self._check_requirement(resource_key)
+
     def set_runtime_properties(self,
                                runtime_properties,
                                instance_id=None,
@@ -303,7 +1514,11 @@ class ResourceManagementContext(object):
         if not instance_id:
             instance_id = self.instance.id
 
-        instance_data = self.rest_client.node_instances.get(instance_id)
+        instance_data = self.rest_client.node_instances.get(
+            instance_id,
+            _include=['version', 'runtime_properties'] if update
+            else ['version']
+        )
         version = instance_data['version']
 
         if update:
@@ -323,6 +1538,20 @@ class ResourceManagementContext(object):
             version=version
         )
 
+    def get_instance_ids(self, node_type):
+        """List id's of instances with given type.
+
+        Args:
+            node_type: node type
+
+        Returns:
+            list instances ids"""
+        return [
+            instance.id
+            for instance in self._instances.instances
+            if instance.type == node_type
+        ]
+
     def add_result_instance_id(self, instance_id=None):
         """Add instance_id to resulted set.
 
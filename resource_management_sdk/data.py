@@ -1,3 +1,5 @@
+from weakref import WeakValueDictionary
+
 from. constants import (
     SCOPE_GLOBAL,
     SCOPE_PROJECT
@@ -12,6 +14,8 @@ class ResourceAvailability(object):
         quota: quota value
         availability: availability value"""
 
+    __slots__ = ('usage', 'quota', 'availability')
+
     def _set_values(self, quota=None, usage=None):
         """Recalculate availability information.
 
@@ -89,26 +93,53 @@ class ResourceAvailability(object):
 
 
 class ResourceKey(object):
-    """Storage for scope/system/resource name
+    """Storage for scope/system/resource name. Keys are immutable and
+    interned - the same scope/system/resource/project always gives the same
+    object.
 
     Attributes:
         _scope: scope name
         _system_name: system_name
         _resource_name: resource_name
-        _project_id: project id"""
+        _project_id: project id
+        _key: key as tuple
+        _hash: hash value of key"""
 
-    def __init__(self, scope, system_name, resource_name, project_id=None):
-        """Class constructor.
+    __slots__ = (
+        '_scope',
+        '_system_name',
+        '_resource_name',
+        '_project_id',
+        '_key',
+        '_hash',
+        '__weakref__'
+    )
+
+    _interned = WeakValueDictionary()
+
+    def __new__(cls, scope, system_name, resource_name, project_id=None):
+        """Class constructor - returns already existing key if possible.
 
         Args:
             scope: scope name
             system_name: system name
             resource_name: resource name
             project_id: optional, project id"""
-        self._scope = SCOPE_GLOBAL if scope == SCOPE_GLOBAL else SCOPE_PROJECT
-        self._system_name = system_name
-        self._resource_name = resource_name
-        self._project_id = project_id
+        scope = SCOPE_GLOBAL if scope == SCOPE_GLOBAL else SCOPE_PROJECT
+        intern_key = (scope, system_name, resource_name, project_id)
+        resource_key = cls._interned.get(intern_key, None)
+
+        if resource_key is None:
+            resource_key = super(ResourceKey, cls).__new__(cls)
+            resource_key._scope = scope
+            resource_key._system_name = system_name
+            resource_key._resource_name = resource_name
+            resource_key._project_id = project_id
+            resource_key._key = (project_id, system_name, resource_name)
+            resource_key._hash = hash(resource_key._key)
+            cls._interned[intern_key] = resource_key
+
+        return resource_key
 
     def __eq__(self, other):
         """Compare current resource with other instance
@@ -118,14 +149,24 @@ class ResourceKey(object):
 
         Returns:
             True, if objects are equal"""
-        return self.as_tuple() == other.as_tuple()
+        return self is other or self._key == other.as_tuple()
+
+    def __ne__(self, other):
+        """Compare current resource with other instance
+
+        Args:
+            other: object for compare
+
+        Returns:
+            True, if objects are not equal"""
+        return not self == other
 
     def __hash__(self):
         """Get hash value for current object.
 
         Returns:
             hash value"""
-        return self.as_tuple().__hash__()
+        return self._hash
 
     @property
     def project_id(self):
@@ -172,7 +213,7 @@ class ResourceKey(object):
 
         Returns:
             tuple like: <project>, <system>, <resource>"""
-        return self._project_id, self._system_name, self._resource_name
+        return self._key
 
     def get_project_resource_key(self, project_id):
         """Return resource key by project.
@@ -1,7 +1,65 @@
+import copy
+import random
+import threading
 import time
 
 from cloudify_rest_client.exceptions import CloudifyClientError
 
+from .constants import (
+    EXECUTION_FIELDS,
+    ID_FILTER_SIZE
+)
+
+
+class PollingStrategy(object):
+    """Retry intervals generator - intervals start from short initial value
+    and grow exponentially up to max value. Each interval is randomized by
+    jitter.
+
+    Attributes:
+        _initial_interval: first retry interval
+        _max_interval: max retry interval
+        _factor: interval growth factor
+        _jitter: max relative deviation of interval"""
+
+    def __init__(self, initial_interval, max_interval, factor, jitter):
+        """Class constructor.
+
+        Args:
+            initial_interval: first retry interval
+            max_interval: max retry interval
+            factor: interval growth factor
+            jitter: max relative deviation of interval (0.0 - 1.0)"""
+        self._max_interval = float(max_interval)
+        self._initial_interval = min(float(initial_interval),
+                                     self._max_interval)
+        self._factor = max(float(factor), 1.0)
+        self._jitter = min(max(float(jitter), 0.0), 1.0)
+
+    def _randomize(self, interval):
+        """Apply jitter to interval"""
+        return interval * random.uniform(1.0 - self._jitter,
+                                         1.0 + self._jitter)
+
+    def intervals(self, expected_duration=None):
+        """Generate retry intervals.
+
+        Args:
+            expected_duration: optional, expected time (in seconds) left
+                to the end of operation, e.g. based on historical duration.
+                If defined, it is used as first interval.
+
+        Returns:
+            generator of retry intervals"""
+        if expected_duration and expected_duration > self._initial_interval:
+            yield self._randomize(float(expected_duration))
+
+        interval = self._initial_interval
+
+        while True:
+            yield self._randomize(interval)
+            interval = min(interval * self._factor, self._max_interval)
+
 
 class ExecutionStatusPoller(object):
     """Execution Status Poller logic
@@ -10,14 +68,19 @@ class ExecutionStatusPoller(object):
         logger_method: logger method for write logs
         rest_client: rest client instance
         _timeout: execution timeout
-        _interval: retry interval
+        _deadline: time after which no execution is waited for
+        _polling_strategy: retry intervals generator
         _success_statuses: list success statuses
         _failure_statuses: list failure statuses"""
 
     DEFAULT_SUCCESS_STATUSES = ['terminated', 'cancelled']
     DEFAULT_FAILURE_STATUSES = ['failed']
+    DEFAULT_INITIAL_INTERVAL = 0.5
     DEFAULT_INTERVAL = 5
+    DEFAULT_BACKOFF_FACTOR = 2.0
+    DEFAULT_JITTER = 0.1
     DEFAULT_TIMEOUT = 180
+    DEFAULT_WORKFLOW_TIMEOUT = -1
 
     def __init__(self, logger_method, rest_client, **kwargs):
         """Class constructor.
@@ -26,7 +89,13 @@ class ExecutionStatusPoller(object):
             logger_method: logger method for write messages
             rest_client: rest client instance
             timeout: optional, operation timeout
-            _interval: optional, retry interval
+            workflow_timeout: optional, time budget (in seconds) shared by
+                all executions waited for by poller, counted from poller
+                creation, -1 means no limit
+            initial_interval: optional, first retry interval
+            interval: optional, max retry interval
+            backoff_factor: optional, retry interval growth factor
+            jitter: optional, max relative deviation of retry interval
             success_statuses: optional, success statuses
             failure_statuses: optional, failure statuses"""
         self.logger_method = logger_method
@@ -34,7 +103,18 @@ class ExecutionStatusPoller(object):
 
         _timeout = kwargs.get('timeout', self.DEFAULT_TIMEOUT)
         self._timeout = float('infinity') if _timeout == -1 else _timeout
-        self._interval = kwargs.get('interval', self.DEFAULT_INTERVAL)
+        _workflow_timeout = kwargs.get(
+            'workflow_timeout',
+            self.DEFAULT_WORKFLOW_TIMEOUT
+        )
+        self._deadline = float('infinity') if _workflow_timeout == -1 \
+            else time.time() + _workflow_timeout
+        self._polling_strategy = PollingStrategy(
+            kwargs.get('initial_interval', self.DEFAULT_INITIAL_INTERVAL),
+            kwargs.get('interval', self.DEFAULT_INTERVAL),
+            kwargs.get('backoff_factor', self.DEFAULT_BACKOFF_FACTOR),
+            kwargs.get('jitter', self.DEFAULT_JITTER)
+        )
 
         self._success_statuses = kwargs.get(
             'success_statuses',
@@ -60,7 +140,8 @@ class ExecutionStatusPoller(object):
                 status in known failed statuses list."""
         try:
             execution = self.rest_client.executions.get(
-                execution_id=execution_id
+                execution_id=execution_id,
+                _include=EXECUTION_FIELDS
             )
         except CloudifyClientError as e:
             raise RuntimeError(
@@ -68,8 +149,24 @@ class ExecutionStatusPoller(object):
                 .format(execution_id, str(e))
             )
 
-        execution_status = execution.get('status', None)
+        return self._process_execution_status(
+            execution_id,
+            execution.get('status', None)
+        )
+
+    def _process_execution_status(self, execution_id, execution_status):
+        """Process executions status
 
+        Args:
+            execution_id: execution id
+            execution_status: execution status got from manager
+
+        Returns:
+            True, for successful run, False for not finished execution
+
+        Raises:
+            RuntimeError: no status or status in known failed statuses
+                list."""
         if not execution_status:
             raise RuntimeError(
                 'Failed to retrieve status for execution: {}'
@@ -99,11 +196,79 @@ class ExecutionStatusPoller(object):
 
         return False
 
-    def run(self, execution_id):
+    def _wait(self, intervals, time_left):
+        """Sleep till next attempt of execution status checking
+
+        Args:
+            intervals: retry intervals generator
+            time_left: time left to timeout - upper limit for sleep"""
+        interval = min(next(intervals), time_left)
+        self.logger_method(
+            'debug',
+            'Waiting {:.2f} seconds for next attempt '
+            'of execution status checking...',
+            interval
+        )
+
+        time.sleep(interval)
+
+    def _get_end_time(self, start_time):
+        """Get time after which execution is not waited for anymore
+
+        Args:
+            start_time: time of waiting start
+
+        Returns:
+            timestamp"""
+        return min(start_time + self._timeout, self._deadline)
+
+    def is_expired(self):
+        """Check if workflow time budget is exhausted
+
+        Returns:
+            True, if no execution is waited for anymore"""
+        return time.time() > self._deadline
+
+    def bind_logger(self, logger_method):
+        """Get poller which shares state with current one, but writes
+        messages by other logger method.
+
+        Args:
+            logger_method: logger method for write messages
+
+        Returns:
+            poller instance"""
+        poller = copy.copy(self)
+        poller.logger_method = logger_method
+        return poller
+
+    def _report_timeout(self, execution_id, now):
+        """Log reason of waiting stop
+
+        Args:
+            execution_id: execution id
+            now: current time"""
+        if now > self._deadline:
+            self.logger_method(
+                'error',
+                'Workflow time budget exhausted - execution {} result '
+                'is undetermined !',
+                execution_id
+            )
+        else:
+            self.logger_method(
+                'error',
+                'Execution {} status checking timed out !',
+                execution_id
+            )
+
+    def run(self, execution_id, expected_duration=None):
         """Wait executions status
 
         Args:
             execution_id: execution id
+            expected_duration: optional, expected time (in seconds) left to
+                the end of execution
 
         Returns:
             True, for successful run
@@ -111,28 +276,281 @@ class ExecutionStatusPoller(object):
         Raises:
             RuntimeError: cann't get executions information or
                 status in known failed statuses list."""
-        start_time = time.time()
-
-        while time.time() <= start_time + self._timeout:
-            if not self._check_execution_status(execution_id):
-                self.logger_method(
-                    'debug',
-                    'Waiting {} seconds for next attempt '
-                    'of execution status checking...',
-                    self._interval
+        end_time = self._get_end_time(time.time())
+        intervals = self._polling_strategy.intervals(expected_duration)
+
+        while not self._check_execution_status(execution_id):
+            now = time.time()
+            time_left = end_time - now
+
+            if time_left <= 0:
+                self._report_timeout(execution_id, now)
+                return False
+
+            self._wait(intervals, time_left)
+
+        return True
+
+
+class MultiExecutionStatusPoller(ExecutionStatusPoller):
+    """Execution Status Poller logic for several executions at once. Statuses
+    of all tracked executions are refreshed by one request.
+
+    Attributes:
+        logger_method: logger method for write logs
+        rest_client: rest client instance
+        _timeout: execution timeout
+        _deadline: time after which no execution is waited for
+        _polling_strategy: retry intervals generator
+        _success_statuses: list success statuses
+        _failure_statuses: list failure statuses
+        _pending: set of tracked and not finished execution ids
+        _finished: finished execution ids with error (None for success)
+        _finish_times: time of finish detection by execution ids
+        _lock: lock guarding tracked executions state - the state is shared
+            with pollers bound to other logger methods (used by threads)"""
+
+    def __init__(self, logger_method, rest_client, **kwargs):
+        """Class constructor.
+
+        Args:
+            logger_method: logger method for write messages
+            rest_client: rest client instance
+            **kwargs: kwargs for ExecutionStatusPoller"""
+        super(MultiExecutionStatusPoller, self).__init__(
+            logger_method,
+            rest_client,
+            **kwargs
+        )
+
+        self._pending = set()
+        self._finished = {}
+        self._finish_times = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Set of tracked and not finished execution ids"""
+        with self._lock:
+            return set(self._pending)
+
+    def get_finish_time(self, execution_id):
+        """Time when execution finish was detected
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            timestamp or None for not finished execution"""
+        return self._finish_times.get(execution_id, None)
+
+    def add(self, execution_id):
+        """Start tracking of execution
+
+        Args:
+            execution_id: execution id"""
+        with self._lock:
+            if execution_id not in self._finished:
+                self._pending.add(execution_id)
+
+    def _get_executions_statuses(self, execution_ids):
+        """Get statuses for executions
+
+        Args:
+            execution_ids: list execution ids
+
+        Returns:
+            dictionary with statuses, as key used execution id
+
+        Raises:
+            RuntimeError: cann't get executions information."""
+        statuses = {}
+
+        for offset in range(0, len(execution_ids), ID_FILTER_SIZE):
+            chunk = execution_ids[offset:offset + ID_FILTER_SIZE]
+
+            try:
+                executions = self.rest_client.executions.list(
+                    id=chunk,
+                    _include=EXECUTION_FIELDS
+                )
+            except CloudifyClientError as e:
+                raise RuntimeError(
+                    'Error during polling executions {0} state. '
+                    'Details: {1}.'
+                    .format(chunk, str(e))
                 )
 
-                time.sleep(self._interval)
-            else:
-                return True
+            for execution in executions:
+                statuses[execution.get('id')] = execution.get('status', None)
 
-        self.logger_method(
-            'error',
-            'Execution {} status checking timed out !',
+        return statuses
+
+    def poll(self):
+        """Refresh statuses of all tracked executions
+
+        Returns:
+            list of execution ids finished since last call
+
+        Raises:
+            RuntimeError: cann't get executions information."""
+        with self._lock:
+            execution_ids = sorted(self._pending)
+
+        statuses = self._get_executions_statuses(execution_ids)
+        errors = {}
+
+        for execution_id in execution_ids:
+            try:
+                if not self._process_execution_status(
+                        execution_id,
+                        statuses.get(execution_id, None)):
+                    continue
+
+                errors[execution_id] = None
+            except RuntimeError as e:
+                errors[execution_id] = e
+
+        finished = []
+
+        if not errors:
+            return finished
+
+        finish_time = time.time()
+
+        with self._lock:
+            # execution could be reported by other thread in meantime
+            for execution_id in sorted(errors):
+                if execution_id in self._finished:
+                    continue
+
+                self._pending.discard(execution_id)
+                self._finished[execution_id] = errors[execution_id]
+                self._finish_times[execution_id] = finish_time
+                finished.append(execution_id)
+
+        return finished
+
+    def is_finished(self, execution_id):
+        """Check if execution finished
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            True, if execution finish was detected"""
+        return execution_id in self._finished
+
+    def is_successful(self, execution_id):
+        """Check if execution finished successfully
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            True, if execution finished without error"""
+        return execution_id in self._finished and \
+            self._finished[execution_id] is None
+
+    def _get_finished(self, execution_ids):
+        """Filter finished executions
+
+        Args:
+            execution_ids: list execution ids
+
+        Returns:
+            list of finished execution ids"""
+        return [
             execution_id
-        )
+            for execution_id in execution_ids
+            if execution_id in self._finished
+        ]
 
-        return False
+    def wait_for_any(self, execution_ids):
+        """Wait till at least one of executions is finished
+
+        Args:
+            execution_ids: list execution ids
+
+        Returns:
+            list of finished execution ids, empty list on timeout
+
+        Raises:
+            RuntimeError: cann't get executions information."""
+        for execution_id in execution_ids:
+            self.add(execution_id)
+
+        end_time = self._get_end_time(time.time())
+        intervals = self._polling_strategy.intervals()
+        finished = self._get_finished(execution_ids)
+
+        while not finished:
+            self.poll()
+            finished = self._get_finished(execution_ids)
+
+            if finished:
+                break
+
+            now = time.time()
+            time_left = end_time - now
+
+            if time_left <= 0:
+                self._report_timeout(', '.join(execution_ids), now)
+                break
+
+            self._wait(intervals, time_left)
+
+        return finished
+
+    def _get_result(self, execution_id):
+        """Get result for finished execution
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            True, for successful run
+
+        Raises:
+            RuntimeError: execution failed."""
+        error = self._finished[execution_id]
+
+        if error:
+            raise error
+
+        return True
+
+    def run(self, execution_id, expected_duration=None):
+        """Wait executions status. Statuses of other tracked executions are
+        refreshed at the same time.
+
+        Args:
+            execution_id: execution id
+            expected_duration: optional, expected time (in seconds) left to
+                the end of execution
+
+        Returns:
+            True, for successful run
+
+        Raises:
+            RuntimeError: cann't get executions information or
+                status in known failed statuses list."""
+        self.add(execution_id)
+        end_time = self._get_end_time(time.time())
+        intervals = self._polling_strategy.intervals(expected_duration)
+
+        while execution_id not in self._finished and \
+                execution_id not in self.poll():
+            now = time.time()
+            time_left = end_time - now
+
+            if time_left <= 0:
+                self._report_timeout(execution_id, now)
+                return False
+
+            self._wait(intervals, time_left)
+
+        return self._get_result(execution_id)
 
 
 class ExecutionRunner(object):
@@ -141,7 +559,9 @@ class ExecutionRunner(object):
     Attributes:
         logger_method: logger method for write messages
         rest_client: rest client instance
-        poller: Execution poller instance"""
+        poller: Execution poller instance
+        durations: last observed execution durations by node id
+        _executions: node id and start time by execution id"""
 
     WORKFLOW_EXECUTE_OPERATION = 'execute_operation'
 
@@ -154,11 +574,13 @@ class ExecutionRunner(object):
             **kwargs: kwargs for ExecutionStatusPoller"""
         self.logger_method = logger_method
         self.rest_client = rest_client
-        self.poller = ExecutionStatusPoller(
+        self.poller = MultiExecutionStatusPoller(
             logger_method,
             rest_client,
             **kwargs
         )
+        self.durations = {}
+        self._executions = {}
 
     def _start_execution(self,
                          deployment_id,
@@ -209,7 +631,48 @@ class ExecutionRunner(object):
         Raises:
             RuntimeError: cann't get executions information or
                 status in known failed statuses list."""
-        return self.poller.run(execution_id)
+        result = self.poller.run(
+            execution_id,
+            self._get_expected_duration(execution_id)
+        )
+
+        if result:
+            self._record_duration(execution_id)
+
+        return result
+
+    def _get_expected_duration(self, execution_id):
+        """Get expected time left to the end of execution based on
+        duration observed for the same node.
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            expected time in seconds or None if unknown"""
+        node_id, start_time = self._executions.get(
+            execution_id,
+            (None, None)
+        )
+
+        if node_id not in self.durations:
+            return None
+
+        return max(self.durations[node_id] - (time.time() - start_time), 0)
+
+    def _record_duration(self, execution_id):
+        """Save duration of finished execution for its node.
+
+        Args:
+            execution_id: execution id"""
+        node_id, start_time = self._executions.pop(
+            execution_id,
+            (None, None)
+        )
+        finish_time = self.poller.get_finish_time(execution_id)
+
+        if node_id and finish_time:
+            self.durations[node_id] = finish_time - start_time
 
     def _get_runtime_properties(self, node_instance_id):
         """Get runtime properties
@@ -220,11 +683,35 @@ class ExecutionRunner(object):
         Returns:
             runtime properties for node instance"""
         node_instance_response = self.rest_client.node_instances.get(
-            node_instance_id
+            node_instance_id,
+            _include=['runtime_properties']
         )
 
         return node_instance_response.runtime_properties
 
+    def _get_runtime_properties_list(self, node_instance_ids):
+        """Get runtime properties for several node instances - one call for
+        each ID_FILTER_SIZE node instances
+
+        Args:
+            node_instance_ids: list of node instance ids
+
+        Returns:
+            dictionary with runtime properties, as key used node instance id"""
+        runtime_properties = {}
+
+        for offset in range(0, len(node_instance_ids), ID_FILTER_SIZE):
+            list_instances_response = self.rest_client.node_instances.list(
+                id=node_instance_ids[offset:offset + ID_FILTER_SIZE],
+                _include=['id', 'runtime_properties']
+            )
+
+            for instance_response in list_instances_response:
+                runtime_properties[instance_response.id] = \
+                    instance_response.runtime_properties
+
+        return runtime_properties
+
     def run(self,
             deployment_id,
             node_instance_id,
@@ -240,6 +727,34 @@ class ExecutionRunner(object):
             operation_inputs: operation inputs
             workflow_id: optional, workflow for run,
                 by default execute_operation
+            node_id: optional, node id of node instance - used for
+                tracking of execution durations
+
+        Returns:
+            executions id"""
+        return self.run_batch(
+            deployment_id,
+            [node_instance_id],
+            operation_name,
+            operation_inputs,
+            **kwargs
+        )
+
+    def run_batch(self,
+                  deployment_id,
+                  node_instance_ids,
+                  operation_name,
+                  operation_inputs,
+                  **kwargs):
+        """Run one execution for several node instances
+
+        Args:
+            deployment_id: deployment id
+            node_instance_ids: list of node instances id
+            operation_name: operation id
+            operation_inputs: operation inputs
+            workflow_id: optional, workflow for run,
+                by default execute_operation
 
         Returns:
             executions id"""
@@ -260,14 +775,124 @@ class ExecutionRunner(object):
             deployment_id,
             workflow_id,
             operation_name,
-            [node_instance_id],
+            node_instance_ids,
             operation_inputs
         )
 
         self.logger_method('debug', 'Got execution ID: {}', execution_id)
+        self.poller.add(execution_id)
+        self._executions[execution_id] = (
+            kwargs.get('node_id', None),
+            time.time()
+        )
 
         return execution_id
 
+    def wait_for_any(self, execution_ids):
+        """Wait till at least one of executions is finished
+
+        Args:
+            execution_ids: list execution ids
+
+        Returns:
+            list of finished execution ids, empty list on timeout"""
+        return self.poller.wait_for_any(execution_ids)
+
+    def is_finished(self, execution_id):
+        """Check if execution finished
+
+        Args:
+            execution_id: execution id
+
+        Returns:
+            True, if execution finish was detected"""
+        return self.poller.is_finished(execution_id)
+
+    def is_expired(self):
+        """Check if workflow time budget is exhausted
+
+        Returns:
+            True, if no execution is waited for anymore"""
+        return self.poller.is_expired()
+
+    def bind_logger(self, logger_method):
+        """Get runner which shares state (tracked executions, durations)
+        with current one, but writes messages by other logger method.
+
+        Args:
+            logger_method: logger method for write messages
+
+        Returns:
+            ExecutionRunner instance"""
+        runner = copy.copy(self)
+        runner.logger_method = logger_method
+        runner.poller = self.poller.bind_logger(logger_method)
+        return runner
+
+    def cancel(self, execution_id):
+        """Cancel execution
+
+        Args:
+            execution_id: execution id"""
+        self.logger_method(
+            'debug',
+            'Cancelling execution {}',
+            execution_id
+        )
+
+        try:
+            self.rest_client.executions.cancel(execution_id)
+        except CloudifyClientError as e:
+            # execution might have finished in meantime
+            self.logger_method(
+                'warn',
+                'Cannot cancel execution {0}. Details: {1}.',
+                execution_id,
+                str(e)
+            )
+
+    def cancel_pending(self):
+        """Cancel all started and not finished executions
+
+        Returns:
+            list of execution ids for which cancel was requested"""
+        execution_ids = sorted(self.poller.pending)
+
+        for execution_id in execution_ids:
+            self.cancel(execution_id)
+
+        return execution_ids
+
+    def get_results(self, executions):
+        """Get results of successfully finished executions. Runtime
+        properties for all node instances are requested in one call.
+
+        Args:
+            executions: dictionary with node instance ids, as key used
+                execution id
+
+        Returns:
+            dictionary with runtime properties, as key used node instance id.
+            Node instances with not finished or failed executions are
+            skipped."""
+        node_instance_ids = []
+
+        for execution_id, node_instance_id in sorted(executions.items()):
+            if self.poller.is_successful(execution_id):
+                self._record_duration(execution_id)
+                node_instance_ids.append(node_instance_id)
+
+        if not node_instance_ids:
+            return {}
+
+        self.logger_method(
+            'debug',
+            'Getting runtime_properties for node instances: {}',
+            node_instance_ids
+        )
+
+        return self._get_runtime_properties_list(node_instance_ids)
+
     def wait_for_result(self, execution_id, node_instance_id):
         """Wait for executions result
 
@@ -288,6 +913,31 @@ class ExecutionRunner(object):
 
         return {}
 
+    def wait_for_results(self, execution_id, node_instance_ids):
+        """Wait for executions result for several node instances
+
+        Args:
+            execution_id: execution id
+            node_instance_ids: list of node instances id
+
+        Returns:
+            dictionary with runtime properties, as key used node instance id"""
+        results = {}
+
+        if self._check_execution_status(execution_id):
+            self.logger_method(
+                'debug',
+                'Getting runtime_properties for node instances: {}',
+                node_instance_ids
+            )
+
+            results = self._get_runtime_properties_list(node_instance_ids)
+
+        return dict(
+            (node_instance_id, results.get(node_instance_id, {}))
+            for node_instance_id in node_instance_ids
+        )
+
     def run_and_wait_for_result(self,
                                 deployment_id,
                                 node_instance_id,
@@ -3,6 +3,7 @@ from .constants import (
     NODE_TYPE_QUOTA,
     NODE_TYPE_USAGE,
     NODE_TYPE_RESULT,
+    RUNTIME_PROPERTY_DURATIONS,
     SYSTEM_NAME_OPENSTACK
 )
 
@@ -15,6 +16,9 @@ class Handler(object):
     Attributes:
         logger: logger instance"""
 
+    # node types served by handler, None - handler can serve any node type
+    NODE_TYPES = None
+
     def __init__(self, logger):
         """Class constructor.
 
@@ -49,6 +53,8 @@ class NoopHandler(Handler):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [None]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -84,6 +90,8 @@ class ProjectHandler(Handler):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [NODE_TYPE_PROJECT]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -268,6 +276,8 @@ class SimpleQuotaHandler(_RuntimePropertyHandlerBase):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [NODE_TYPE_QUOTA]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -304,6 +314,8 @@ class SimpleUsageHandler(_RuntimePropertyHandlerBase):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [NODE_TYPE_USAGE]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -326,14 +338,20 @@ class SimpleUsageHandler(_RuntimePropertyHandlerBase):
 
         Returns:
             None"""
-        rsm_ctx.log('info', 'Executing "list" operation for get usage ...')
+        runtime_properties = rsm_ctx.get_cached_result()
 
-        runtime_properties = rsm_ctx.run_execution()
-        rsm_ctx.log(
-            'info',
-            'Got {} runtime_properties after execution',
-            runtime_properties.keys()
-        )
+        if runtime_properties is None:
+            rsm_ctx.log(
+                'info',
+                'Executing "list" operation for get usage ...'
+            )
+
+            runtime_properties = rsm_ctx.run_execution()
+            rsm_ctx.log(
+                'info',
+                'Got {} runtime_properties after execution',
+                runtime_properties.keys()
+            )
 
         self._process_runtime_properties(
             rsm_ctx,
@@ -349,6 +367,8 @@ class ExecutionStartUsageHandler(_RuntimePropertyHandlerBase):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [NODE_TYPE_USAGE]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -364,13 +384,24 @@ class ExecutionStartUsageHandler(_RuntimePropertyHandlerBase):
     def handle(self, rsm_ctx):
         """Logic which should be executed for given 'rsm_ctx'.
 
-        Run execution on 'rsm_ctx'.
+        Run execution on 'rsm_ctx' (if there is no fresh result of previous
+        execution).
 
         Args:
             rsm_ctx: instance for handle.
 
         Returns:
             None"""
+        if rsm_ctx.get_cached_result() is not None:
+            return
+
+        self._start(rsm_ctx)
+
+    def _start(self, rsm_ctx):
+        """Start execution for 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: instance for handle."""
         rsm_ctx.log(
             'info',
             'Starting executing for "list" operation for get usage ...'
@@ -391,6 +422,8 @@ class ExecutionResultUsageHandler(_RuntimePropertyHandlerBase):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [NODE_TYPE_USAGE]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -413,7 +446,10 @@ class ExecutionResultUsageHandler(_RuntimePropertyHandlerBase):
 
         Returns:
             None"""
-        runtime_properties = rsm_ctx.get_execution_result()
+        runtime_properties = rsm_ctx.get_cached_result()
+
+        if runtime_properties is None:
+            runtime_properties = self._get_result(rsm_ctx)
 
         rsm_ctx.log(
             'info',
@@ -427,6 +463,137 @@ class ExecutionResultUsageHandler(_RuntimePropertyHandlerBase):
             self.VALUE_TYPE_USAGE
         )
 
+    def _get_result(self, rsm_ctx):
+        """Wait for result of execution started for 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: instance for handle.
+
+        Returns:
+            runtime properties got after execution"""
+        return rsm_ctx.get_execution_result()
+
+
+class BatchExecutionStartUsageHandler(ExecutionStartUsageHandler):
+    """Starts ('list') operartion execution for usage value gathering - one
+    execution for batch of instances from the same deployment with the same
+    operation inputs (used in 'batch' mode)
+
+    Attributes:
+        logger: logger instance"""
+
+    def _start(self, rsm_ctx):
+        """Run batch execution on 'rsm_ctx' (if not started yet).
+
+        Args:
+            rsm_ctx: instance for handle."""
+        execution_id = rsm_ctx.run_batch_execution()
+        rsm_ctx.log(
+            'info',
+            'Usage will be gathered by execution with ID: {} ...',
+            execution_id
+        )
+
+
+class BatchExecutionResultUsageHandler(ExecutionResultUsageHandler):
+    """Checks if ('list') operartion execution started by
+    'BatchExecutionStartUsageHandler' has ended. If yes gathers result as
+    usage value (used in 'batch' mode)
+
+    Attributes:
+        logger: logger instance"""
+
+    def _get_result(self, rsm_ctx):
+        """Wait for result of execution started for 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: instance for handle.
+
+        Returns:
+            runtime properties got after execution"""
+        return rsm_ctx.get_batch_execution_result()
+
+
+class WindowedExecutionStartUsageHandler(ExecutionStartUsageHandler):
+    """Starts ('list') operartion execution for usage value gathering, but
+    keeps number of running executions limited by 'max_in_flight' - new
+    execution is started when any of running executions ends (used in
+    'windowed' mode)
+
+    Attributes:
+        logger: logger instance"""
+
+    def _start(self, rsm_ctx):
+        """Run execution on 'rsm_ctx' when there is free place in window.
+
+        Args:
+            rsm_ctx: instance for handle."""
+        execution_id = rsm_ctx.run_windowed_execution()
+        rsm_ctx.log(
+            'info',
+            'Execution started with ID: {} ...',
+            execution_id
+        )
+
+
+class WindowedExecutionResultUsageHandler(ExecutionResultUsageHandler):
+    """Gathers result of ('list') operartion execution started by
+    'WindowedExecutionStartUsageHandler' as usage value (used in 'windowed'
+    mode)
+
+    Attributes:
+        logger: logger instance"""
+
+    def _get_result(self, rsm_ctx):
+        """Wait for result of execution started for 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: instance for handle.
+
+        Returns:
+            runtime properties got after execution"""
+        return rsm_ctx.get_windowed_execution_result()
+
+
+class ConcurrentExecutionStartUsageHandler(ExecutionStartUsageHandler):
+    """Schedules start of ('list') operartion execution for usage value
+    gathering in thread pool - handler doesn't wait for REST call end (used in
+    'concurrent' mode)
+
+    Attributes:
+        logger: logger instance"""
+
+    def _start(self, rsm_ctx):
+        """Schedule execution start on 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: instance for handle."""
+        rsm_ctx.log(
+            'info',
+            'Scheduling execution for "list" operation for get usage ...'
+        )
+
+        rsm_ctx.run_concurrent_execution()
+
+
+class ConcurrentExecutionResultUsageHandler(ExecutionResultUsageHandler):
+    """Gathers result of ('list') operartion execution started by
+    'ConcurrentExecutionStartUsageHandler' as usage value (used in
+    'concurrent' mode)
+
+    Attributes:
+        logger: logger instance"""
+
+    def _get_result(self, rsm_ctx):
+        """Wait for result of execution started for 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: instance for handle.
+
+        Returns:
+            runtime properties got after execution"""
+        return rsm_ctx.get_concurrent_execution_result()
+
 
 class OpenstackQuotaHandler(SimpleQuotaHandler):
     """Gathers quota value from instance runtime_properties and do necessary
@@ -510,6 +677,8 @@ class ResultHandler(Handler):
     Attributes:
         logger: logger instance"""
 
+    NODE_TYPES = [NODE_TYPE_RESULT]
+
     def can_handle(self, rsm_ctx):
         """Check support 'rsm_ctx' type by handler.
 
@@ -540,5 +709,87 @@ class ResultHandler(Handler):
 
         rsm_ctx.add_result_instance_id()
         rsm_ctx.set_runtime_properties({
-            'data': rsm_ctx.dump()
+            'data': rsm_ctx.dump(),
+            RUNTIME_PROPERTY_DURATIONS: rsm_ctx.execution_durations
         })
+
+
+class HandlerDispatcher(object):
+    """Selects handler for instance using node types declared by handlers -
+    'can_handle' is checked only for handlers serving instance node type
+    (and handlers without declared node types)
+
+    Attributes:
+        _handlers_by_type: candidate handlers lists, as key used node type
+        _any_type_handlers: handlers without declared node types"""
+
+    def __init__(self, handlers):
+        """Class constructor.
+
+        Args:
+            handlers: list of handlers, order defines priority"""
+        self._any_type_handlers = [
+            handler
+            for handler in handlers
+            if self._get_node_types(handler) is None
+        ]
+        node_types = set()
+
+        for handler in handlers:
+            node_types.update(self._get_node_types(handler) or [])
+
+        self._handlers_by_type = dict(
+            (node_type, [
+                handler
+                for handler in handlers
+                if self._serves(handler, node_type)
+            ])
+            for node_type in node_types
+        )
+
+    @staticmethod
+    def _get_node_types(handler):
+        """Get node types declared by handler.
+
+        Args:
+            handler: handler instance
+
+        Returns:
+            list of node types or None if not declared"""
+        if isinstance(handler, Handler):
+            return handler.NODE_TYPES
+
+        return None
+
+    @classmethod
+    def _serves(cls, handler, node_type):
+        """Check if handler can serve node type.
+
+        Args:
+            handler: handler instance
+            node_type: node type
+
+        Returns:
+            True, if node type is declared by handler or handler has no
+            declared node types"""
+        node_types = cls._get_node_types(handler)
+        return node_types is None or node_type in node_types
+
+    def get_handler(self, rsm_ctx):
+        """Find handler for current instance of 'rsm_ctx'.
+
+        Args:
+            rsm_ctx: context with instance for check.
+
+        Returns:
+            first handler able to handle instance or None"""
+        candidates = self._handlers_by_type.get(
+            rsm_ctx.instance.type,
+            self._any_type_handlers
+        )
+
+        for handler in candidates:
+            if handler.can_handle(rsm_ctx):
+                return handler
+
+        return None
@@ -1,7 +1,13 @@
+from array import array
 from collections import OrderedDict
+from itertools import chain, islice, repeat
 
 from .constants import (
+    DEFAULT_PAGE_SIZE,
+    NODE_FIELDS,
+    NODE_INSTANCE_FIELDS,
     NODE_TYPE_ROOT,
+    NODE_TYPES,
     PROPERTY_RESOURCE_NAME,
     PROPERTY_RUNTIME_PROPERTY_NAME,
     PROPERTY_SCOPE,
@@ -24,6 +30,7 @@ class Instance(object):
         _deployment_id: deployment id
         _properties: instance properties
         _runtime_properties: instance runtime properties
+        _node_id: node id
         _execution_id: execution id"""
 
     @classmethod
@@ -41,12 +48,25 @@ class Instance(object):
         if len(type_hierarchy) > 0:
             return type_hierarchy[0]
 
+    @classmethod
+    def is_supported(cls, type_hierarchy):
+        """Check if type hierarchy contains any of types supported by
+        Resource Management Plugin.
+
+        Args:
+            type_hierarchy: types list
+
+        Returns:
+            True, if instance with such types should be processed"""
+        return any(node_type in type_hierarchy for node_type in NODE_TYPES)
+
     def __init__(self,
                  id,
                  deployment_id,
                  type_hierarchy,
                  properties,
-                 runtime_properties):
+                 runtime_properties,
+                 node_id=None):
         """Class constructor.
 
         Args:
@@ -54,7 +74,8 @@ class Instance(object):
             deployment_id: deployment id
             type_hierarchy: string list with instance types hierarchy
             properties: instance properties
-            runtime_properties: instance runtime properties"""
+            runtime_properties: instance runtime properties
+            node_id: optional, node id"""
         self._id = id
         self._type = self._get_type(type_hierarchy)
         self._system_name = properties.get(PROPERTY_SYSTEM_NAME)
@@ -68,6 +89,7 @@ class Instance(object):
         self._deployment_id = deployment_id
         self._properties = dict(properties)
         self._runtime_properties = dict(runtime_properties)
+        self._node_id = node_id
         self._execution_id = None
 
     @property
@@ -80,6 +102,11 @@ class Instance(object):
         """Deployment id"""
         return self._deployment_id
 
+    @property
+    def node_id(self):
+        """Node id"""
+        return self._node_id
+
     @property
     def properties(self):
         """Instance properties"""
@@ -149,6 +176,7 @@ class WorkflowCtxInstanceAdapter(Instance):
         _deployment_id: deployment id
         _properties: instance properties
         _runtime_properties: instance runtime properties
+        _node_id: node id
         _execution_id: execution id"""
 
     @classmethod
@@ -159,8 +187,13 @@ class WorkflowCtxInstanceAdapter(Instance):
             ctx: cloudify context
 
         Returns:
-            list instances converted to current class"""
-        return [cls(instance_ctx) for instance_ctx in ctx.node_instances]
+            list instances (only with types supported by plugin) converted
+            to current class"""
+        return [
+            cls(instance_ctx)
+            for instance_ctx in ctx.node_instances
+            if cls.is_supported(instance_ctx.node.type_hierarchy)
+        ]
 
     def __init__(self, instance_ctx):
         """Class constructor.
@@ -174,9 +207,10 @@ class WorkflowCtxInstanceAdapter(Instance):
             # TODO from WorkflowNodeInstance !!!
             instance_ctx.node.type_hierarchy,
             instance_ctx.node.properties,
-            instance_ctx._node_instance.runtime_properties
+            instance_ctx._node_instance.runtime_properties,
             # TODO Replace above with proper method of getting runtime
             # TODO properties from WorkflowNodeInstance !!!
+            instance_ctx.node_id
         )
 
 
@@ -193,33 +227,140 @@ class RestClientInstanceAdapter(Instance):
         _deployment_id: deployment id
         _properties: instance properties
         _runtime_properties: instance runtime properties
+        _node_id: node id
         _execution_id: execution id"""
 
     @classmethod
-    def get_instances(cls, rest_client, deployment_id):
-        """Get instances from context.
+    def _get_nodes(cls, rest_client, deployment_id):
+        """Get all nodes defined in deployment.
 
         Args:
             rest_client: rest client instance
             deployment_id: cloudify deployment id
 
         Returns:
-            list instances converted to current class"""
-        result = []
-
-        list_instances_response = rest_client.node_instances.list(
-            deployment_id=deployment_id
+            dictionary with nodes, as key used node id"""
+        list_nodes_response = rest_client.nodes.list(
+            deployment_id=deployment_id,
+            _include=NODE_FIELDS
         )
 
-        for instance_response in list_instances_response:
-            node_response = rest_client.nodes.get(
+        return dict((node.id, node) for node in list_nodes_response)
+
+    @classmethod
+    def _iter_instances_responses(cls,
+                                  rest_client,
+                                  deployment_id,
+                                  node_ids,
+                                  page_size):
+        """Walk through node instances list page by page.
+
+        Args:
+            rest_client: rest client instance
+            deployment_id: cloudify deployment id
+            node_ids: list of node ids, for which instances are requested
+            page_size: number of node instances requested in one call
+
+        Returns:
+            generator of cloudify node instances"""
+        offset = 0
+
+        while True:
+            list_instances_response = rest_client.node_instances.list(
                 deployment_id=deployment_id,
-                node_id=instance_response.node_id
+                node_id=node_ids,
+                _include=NODE_INSTANCE_FIELDS,
+                _offset=offset,
+                _size=page_size
             )
 
-            result.append(cls(instance_response, node_response))
+            count = 0
+
+            for instance_response in list_instances_response:
+                count += 1
+                yield instance_response
+
+            offset += count
+            pagination = list_instances_response.metadata.pagination
+
+            # manager can return less items than requested (max page size
+            # limited on server side) - only total count is reliable
+            if not count or offset >= pagination.total:
+                break
+
+    @classmethod
+    def iter_instances(cls,
+                       rest_client,
+                       deployment_id,
+                       page_size=DEFAULT_PAGE_SIZE):
+        """Get instances from context page by page.
+
+        Args:
+            rest_client: rest client instance
+            deployment_id: cloudify deployment id
+            page_size: optional, number of node instances requested in one
+                call, by default DEFAULT_PAGE_SIZE
+
+        Returns:
+            generator of instances (only with types supported by plugin)
+            converted to current class"""
+        nodes = dict(
+            (node_id, node_response)
+            for node_id, node_response
+            in cls._get_nodes(rest_client, deployment_id).iteritems()
+            if cls.is_supported(node_response.type_hierarchy)
+        )
+
+        if not nodes:
+            return
+
+        for instance_response in cls._iter_instances_responses(
+                rest_client,
+                deployment_id,
+                sorted(nodes.keys()),
+                page_size):
+            node_response = nodes.get(instance_response.node_id, None)
+
+            if node_response is not None:
+                yield cls(instance_response, node_response)
+
+    @classmethod
+    def get_instances(cls,
+                      rest_client,
+                      deployment_id,
+                      page_size=DEFAULT_PAGE_SIZE):
+        """Get instances from context.
+
+        Args:
+            rest_client: rest client instance
+            deployment_id: cloudify deployment id
+            page_size: optional, number of node instances requested in one
+                call, by default DEFAULT_PAGE_SIZE
 
-        return result
+        Returns:
+            list instances (only with types supported by plugin) converted
+            to current class"""
+        return list(cls.iter_instances(rest_client, deployment_id, page_size))
+
+    @classmethod
+    def prefetch_instances(cls,
+                           rest_client,
+                           deployment_id,
+                           page_size=DEFAULT_PAGE_SIZE):
+        """Get first page of instances from context, next pages are
+        requested during iteration.
+
+        Args:
+            rest_client: rest client instance
+            deployment_id: cloudify deployment id
+            page_size: optional, number of node instances requested in one
+                call, by default DEFAULT_PAGE_SIZE
+
+        Returns:
+            iterator of instances (only with types supported by plugin)
+            converted to current class"""
+        instances = cls.iter_instances(rest_client, deployment_id, page_size)
+        return chain(list(islice(instances, page_size)), instances)
 
     def __init__(self, instance_response, node_response):
         """Class constructor.
@@ -233,59 +374,28 @@ class RestClientInstanceAdapter(Instance):
             node_response.type_hierarchy,
             node_response.properties,
             instance_response.runtime_properties,
+            instance_response.node_id
         )
 
 
 class Instances(object):
-    """Proxy for list instances grouped by scope
+    """Proxy for list instances grouped by scope. Operational data is kept
+    in parallel arrays (instances, project indexes and visited flags) which
+    are built once and reused by reset.
 
     Attributes:
         logger: logger instance
         _initial_data: list of initial instances
-        _operational_data: list instances for process
-        _position: current position in operational_data"""
+        _instances: list instances for process
+        _projects: list project names
+        _project_indexes: index of project (in _projects) for each instance
+        _visited: visited flag for each instance
+        _rebuild: operational data has to be rebuilt on reset
+        _position: current position in operational data
+        _left_counts: number of unprocessed instances by project"""
 
     PROJECT_GLOBAL = SCOPE_GLOBAL
 
-    @classmethod
-    def _prepare_operational_data(cls, initial_data):
-        """Prepare_operational_data
-
-        Args:
-            initial_data: initial data
-
-        Returns:
-            list of prepered instances for process"""
-        operational_data = []
-
-        for project, instances in initial_data.iteritems():
-            operational_data.extend(
-                cls._prepare_operational_data_for_project(project, instances)
-            )
-
-        return operational_data
-
-    @classmethod
-    def _prepare_operational_data_for_project(cls, project, instances):
-        """Prepare operation data for project
-
-        Args:
-            project: project name
-            instances: instance list
-
-        Returns:
-            list of prepered instances for process"""
-        operational_data = []
-
-        for instance in instances:
-            operational_data.append({
-                'instance': instance,
-                'project': project,
-                'visited': False
-            })
-
-        return operational_data
-
     def __init__(self, logger, instances):
         """Class constructor.
 
@@ -295,58 +405,120 @@ class Instances(object):
         self.logger = logger
 
         self._initial_data = OrderedDict({self.PROJECT_GLOBAL: instances})
-        self._operational_data = []
+        self._instances = []
+        self._projects = []
+        self._project_indexes = array('I')
+        self._visited = bytearray()
+        self._rebuild = True
         self._position = -1
+        self._left_counts = OrderedDict()
 
         self.reset()
 
-    @property
-    def _current_instance(self):
-        """Current instance for process"""
-        if self._position < len(self._operational_data):
-            return self._operational_data[self._position]
-
-        raise RuntimeError(
-            'Unexpected Instances list state - '
-            'there are {0} instances,'
-            ' but current instance seems to be instance number {1}'
-            .format(len(self._operational_data), self._position)
-        )
+    def _build_operational_data(self):
+        """Build operational data from initial data"""
+        self._instances = []
+        self._projects = list(self._initial_data.keys())
+        self._project_indexes = array('I')
+
+        for project_index, instances in \
+                enumerate(self._initial_data.itervalues()):
+            self._instances.extend(instances)
+            self._project_indexes.extend(
+                repeat(project_index, len(instances))
+            )
+
+        self._rebuild = False
+
+    def _get_instance_info(self, position):
+        """Get instance information
+
+        Args:
+            position: position in operational data
+
+        Returns:
+            dictionary with instance, project name and visited flag"""
+        return {
+            'instance': self._instances[position],
+            'project': self._projects[self._project_indexes[position]],
+            'visited': bool(self._visited[position])
+        }
+
+    def _check_position(self):
+        """Check current position
+
+        Raises:
+            RuntimeError: current position is out of operational data"""
+        if self._position >= len(self._instances):
+            raise RuntimeError(
+                'Unexpected Instances list state - '
+                'there are {0} instances,'
+                ' but current instance seems to be instance number {1}'
+                .format(len(self._instances), self._position)
+            )
 
     @property
     def current_instance(self):
         """Current instance"""
-        return self._current_instance['instance']
+        self._check_position()
+        return self._instances[self._position]
 
     @property
     def current_project(self):
         """Current project"""
-        return self._current_instance['project']
+        self._check_position()
+        return self._projects[self._project_indexes[self._position]]
 
     @property
-    def left_instances(self):
-        """List of unprocessed instances"""
-        left_instances = OrderedDict(
-            [(project, 0) for project in self._initial_data.keys()]
-        )
+    def position(self):
+        """Current position in process list"""
+        return self._position
 
-        for instance in self._operational_data:
-            if not instance['visited']:
-                project = instance['project']
-                left_instances[project] = left_instances.get(project, 0) + 1
+    @property
+    def instances(self):
+        """List of all instances for process"""
+        return list(self._instances)
 
-        return left_instances
+    def iter_instances(self):
+        """Iterate over all instances for process with their projects
+
+        Returns:
+            iterator of (instance, project name) tuples"""
+        for position, instance in enumerate(self._instances):
+            yield instance, self._projects[self._project_indexes[position]]
+
+    @property
+    def left_instances(self):
+        """Number of unprocessed instances by project"""
+        return OrderedDict(self._left_counts)
 
     def add_project(self, name, instances):
         """Add instances to processed list.
 
         Args:
             name: key name for instances
-            instances: instances to add"""
-        self._initial_data[name] = instances
-        self._operational_data.extend(
-            self._prepare_operational_data_for_project(name, instances)
-        )
+            instances: iterable with instances to add, consumed one by one
+
+        Returns:
+            number of added instances"""
+        # instances of replaced project are dropped on next reset
+        if name in self._initial_data:
+            self._rebuild = True
+
+        project_instances = []
+        project_index = len(self._projects)
+        self._initial_data[name] = project_instances
+        self._projects.append(name)
+        self._left_counts.setdefault(name, 0)
+
+        for instance in instances:
+            project_instances.append(instance)
+            self._instances.append(instance)
+            self._project_indexes.append(project_index)
+            self._visited.append(0)
+
+        self._left_counts[name] += len(project_instances)
+        return len(project_instances)
 
     def next_instance(self):
         """Go to next instance
@@ -355,25 +527,43 @@ class Instances(object):
             next instance for process"""
         self._position += 1
 
-        if self._position < len(self._operational_data):
-            instance = self._operational_data[self._position]
-
-            if instance['visited']:
-                return self.next_instance()
+        # skip already visited instances
+        while self._position < len(self._instances):
+            if not self._visited[self._position]:
+                self._visited[self._position] = 1
+                instance = self._get_instance_info(self._position)
+                self._left_counts[instance['project']] -= 1
+                return instance
 
-            instance['visited'] = True
-            return instance
+            self._position += 1
 
         self.logger.info('No instances left to be processed')
         return None
 
+    def select(self, position):
+        """Go to given position in process list without changing
+        processing state.
+
+        Args:
+            position: position in process list
+
+        Returns:
+            instance on given position"""
+        self._position = position
+        return self.current_instance
+
     def reset(self):
         """Reset position in process list
 
         Returns:
             first instance for process"""
-        self._operational_data = self._prepare_operational_data(
-            self._initial_data
+        if self._rebuild:
+            self._build_operational_data()
+
+        self._visited = bytearray(len(self._instances))
+        self._left_counts = OrderedDict(
+            (project, len(instances))
+            for project, instances in self._initial_data.iteritems()
         )
         self._position = -1
 
@@ -385,18 +575,18 @@ class Instances(object):
         Returns:
             dictionary with current interanl state"""
         return {
-            'total': len(self._operational_data),
+            'total': len(self._instances),
             'current': self._position + 1,
             'left': self.left_instances,
             'processed': [
-                instance_info['instance'].id
-                for instance_info in self._operational_data
-                if instance_info['visited']
+                instance.id
+                for instance, visited in zip(self._instances, self._visited)
+                if visited
             ],
             'to_be_processed': [
-                instance_info['instance'].id
-                for instance_info in self._operational_data
-                if not instance_info['visited']
+                instance.id
+                for instance, visited in zip(self._instances, self._visited)
+                if not visited
             ]
         }
 
@@ -414,7 +604,7 @@ class Instances(object):
         )
 
         return '\n-- TOTAL: {0} \n-- CURRENT: {1} \n-- LEFT: {2} '.format(
-            len(self._operational_data),
+            len(self._instances),
             self._position + 1,
             projects_info
         )
@@ -202,6 +202,58 @@ class ResourcesProfile(object):
                 .format(value)
             )
 
+    def get_requirements(self, project_id):
+        """Get requirements for project.
+
+        Args:
+            project_id: project name for validate
+
+        Returns:
+            dictionary with requirement values, as key used resource key
+            with project id"""
+        return dict(
+            (resource_key.get_project_resource_key(project_id), value)
+            for resource_key, value in self._requirements_data.iteritems()
+        )
+
+    def get_resource_keys(self, project_id):
+        """Get keys of resources required for project.
+
+        Args:
+            project_id: project name for validate
+
+        Returns:
+            list of resource keys with project id"""
+        return list(self.get_requirements(project_id).keys())
+
+    @staticmethod
+    def check_requirement(resource_key, requirement_value, availability_data):
+        """Check single requirement.
+
+        Args:
+            resource_key: resource key with project id
+            requirement_value: requirement value
+            availability_data: ResourceAvailability instance or None
+
+        Returns:
+            NoAvailableResourcesError, CannotDetermineAvailabilityError
+            (availability not calculated) or None if requirement is met"""
+        if availability_data is None or \
+                availability_data.availability is None:
+            return CannotDetermineAvailabilityError(
+                resource_key,
+                requirement_value
+            )
+
+        if requirement_value > availability_data.availability:
+            return NoAvailableResourcesError(
+                resource_key,
+                requirement_value,
+                availability_data.availability
+            )
+
+        return None
+
     def validate(self, rsm_ctx, project_id):
         """Validate current resource managment context instance by current
         profile.
@@ -225,9 +277,8 @@ class ResourcesProfile(object):
             project_resource_key = resource_key.get_project_resource_key(
                 project_id
             )
-            availability_data = rsm_ctx.collected_data.get(
-                project_resource_key,
-                None
+            availability_data = rsm_ctx.get_availability_data(
+                project_resource_key
             )
 
             rsm_ctx.logger.debug(
@@ -235,24 +286,14 @@ class ResourcesProfile(object):
                 .format(project_resource_key, availability_data)
             )
 
-            if not availability_data:
-                errors.append(
-                    CannotDetermineAvailabilityError(
-                        project_resource_key,
-                        requirement_value
-                    )
-                )
-
-                continue
+            error = self.check_requirement(
+                project_resource_key,
+                requirement_value,
+                availability_data
+            )
 
-            if requirement_value > availability_data.availability:
-                errors.append(
-                    NoAvailableResourcesError(
-                        project_resource_key,
-                        requirement_value,
-                        availability_data.availability
-                    )
-                )
+            if error:
+                errors.append(error)
 
         return errors
 
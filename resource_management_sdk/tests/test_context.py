@@ -12,20 +12,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import unittest
-from mock import Mock
+from mock import call, Mock, patch
 from collections import OrderedDict
 
+from cloudify_rest_client.responses import ListResponse
+
 import resource_management_sdk.context as context
 import resource_management_sdk.data as data
+import resource_management_sdk.profile as profile
+
+
+def _list_response(items, total=None):
+    """Rest client list response with pagination metadata"""
+    return ListResponse(items, {'pagination': {
+        'total': len(items) if total is None else total,
+        'offset': 0,
+        'size': len(items)
+    }})
 
 
 class TestContext(unittest.TestCase):
 
     def test_ResourceManagementContext_get_execution_result(self):
         inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
-        _client.executions.get = Mock(return_value={'status': 'terminated'})
+        _client.executions.list = Mock(
+            return_value=[{'id': '1234', 'status': 'terminated'}])
         _client.node_instances.get = Mock(
             return_value=_instances_ctx._node_instance)
+        inst.instance.set_execution_id('1234')
         self.assertEqual(inst.get_execution_result(),
                          {'c': 'd', 'resource': 'b'})
 
@@ -34,14 +48,16 @@ class TestContext(unittest.TestCase):
         _execution_start_mock = Mock()
         _execution_start_mock.id = "1234"
         _client.executions.start = Mock(return_value=_execution_start_mock)
-        _client.executions.get = Mock(return_value={'status': 'terminated'})
+        _client.executions.list = Mock(
+            return_value=[{'id': '1234', 'status': 'terminated'}])
         _client.node_instances.get = Mock(
             return_value=_instances_ctx._node_instance)
 
         # check with wait for result
         self.assertEqual(inst.run_execution(), {'c': 'd', 'resource': 'b'})
 
-        _client.executions.get.assert_called_with(execution_id='1234')
+        _client.executions.list.assert_called_with(
+            id=['1234'], _include=['id', 'status'])
         _client.executions.start.assert_called_with(
             'deployment_id', 'execute_operation',
             allow_custom_parameters=True, force=True,
@@ -54,6 +70,234 @@ class TestContext(unittest.TestCase):
         # check without waiting
         self.assertEqual(inst.run_execution(wait=False), "1234")
 
+    def test_ResourceManagementContext_cached_result(self):
+        inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
+        _execution_start_mock = Mock()
+        _execution_start_mock.id = "1234"
+        _client.executions.start = Mock(return_value=_execution_start_mock)
+        _client.node_instances.get = Mock(return_value={'version': 2})
+
+        # cache disabled by default
+        inst.instance.runtime_properties[context.RUNTIME_PROPERTY_CACHE] = {
+            'timestamp': 0, 'operation_inputs': {}}
+        self.assertEqual(inst.get_cached_result(), None)
+
+        inst = context.ResourceManagementContext(_ctx, _client, max_age=60)
+        inst.execution_runner.wait_for_result = Mock(
+            return_value={'c': 'd'})
+
+        with patch('time.time', Mock(return_value=100)):
+            # too old
+            self.assertEqual(inst.get_cached_result(), None)
+
+            # result is saved with timestamp
+            self.assertEqual(inst.run_execution(), {'c': 'd'})
+
+        _client.node_instances.update.assert_called_once_with(
+            'id', version=2, runtime_properties={
+                'c': 'd',
+                context.RUNTIME_PROPERTY_CACHE: {
+                    'timestamp': 100, 'operation_inputs': {}}})
+
+        # fresh result
+        inst.instance.runtime_properties[context.RUNTIME_PROPERTY_CACHE] = {
+            'timestamp': 100, 'operation_inputs': {}}
+
+        with patch('time.time', Mock(return_value=130)):
+            self.assertEqual(
+                inst.get_cached_result(), inst.instance.runtime_properties)
+
+        # the same result is used till the end of run
+        with patch('time.time', Mock(return_value=200)):
+            self.assertEqual(
+                inst.get_cached_result(), inst.instance.runtime_properties)
+
+        # different operation inputs
+        inst = context.ResourceManagementContext(_ctx, _client, max_age=60)
+        inst.instance.runtime_properties[context.RUNTIME_PROPERTY_CACHE] = {
+            'timestamp': 100, 'operation_inputs': {'a': 'b'}}
+
+        with patch('time.time', Mock(return_value=130)):
+            self.assertEqual(inst.get_cached_result(), None)
+
+    def test_ResourceManagementContext_shared_cached_result(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for timestamp in [100, 0, None]:
+            instance_id = 'id_{}'.format(len(_ctx.node_instances))
+            _instances_ctx = self._gen_usage_node_instance(
+                instance_id, 'deployment_id', {
+                    'system_name': 'system',
+                    'resource_name': 'resource',
+                    'scope': 'global'
+                }, {'usage': instance_id})
+
+            if timestamp is not None:
+                _instances_ctx._node_instance.runtime_properties[
+                    context.RUNTIME_PROPERTY_CACHE] = {
+                        'timestamp': timestamp, 'operation_inputs': {}}
+
+            _ctx.node_instances.append(_instances_ctx)
+
+        inst = context.ResourceManagementContext(_ctx, _client, max_age=60)
+        results = []
+
+        with patch('time.time', Mock(return_value=130)):
+            while True:
+                results.append(inst.get_cached_result())
+
+                if not inst.next_instance():
+                    break
+
+            # the same results on next call (e.g. by result handler)
+            inst.reset()
+            self.assertEqual(inst.get_cached_result()['usage'], 'id_0')
+            inst.next_instance()
+            self.assertEqual(inst.get_cached_result()['usage'], 'id_0')
+
+        # fresh result of first instance reused by equivalent ones
+        self.assertEqual([result['usage'] for result in results],
+                         ['id_0', 'id_0', 'id_0'])
+        self.assertEqual(inst.saved_executions, 2)
+        _client.executions.start.assert_not_called()
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_cached_result_modes(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = [
+            self._gen_usage_node_instance('id_0', runtime_properties={
+                'usage': 'id_0',
+                context.RUNTIME_PROPERTY_CACHE: {
+                    'timestamp': 100, 'operation_inputs': {}}}),
+            self._gen_usage_node_instance('id_1')
+        ]
+        _client.executions.start = Mock(
+            side_effect=lambda deployment_id, workflow_id, parameters,
+            **kwargs: Mock(id=parameters['node_instance_ids'][0]))
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id, 'status': 'terminated'}
+            for execution_id in id
+        ])
+        _client.node_instances.list = Mock(side_effect=lambda id, **kwargs: [
+            Mock(id=instance_id, runtime_properties={'usage': instance_id})
+            for instance_id in id
+        ])
+        _client.node_instances.get = Mock(
+            side_effect=lambda instance_id, **kwargs: Mock(
+                runtime_properties={'usage': instance_id}))
+
+        for run_method, result_method in [
+                ('run_batch_execution', 'get_batch_execution_result'),
+                ('run_windowed_execution', 'get_windowed_execution_result'),
+                ('run_concurrent_execution',
+                 'get_concurrent_execution_result')]:
+            _client.executions.start.reset_mock()
+            inst = context.ResourceManagementContext(_ctx, _client,
+                                                     max_age=60)
+            inst.set_runtime_properties = Mock()
+
+            with patch('time.time', Mock(return_value=130)):
+                self.assertEqual(inst.get_cached_result()['usage'], 'id_0')
+                inst.next_instance()
+                self.assertEqual(inst.get_cached_result(), None)
+
+                # instance with fresh result is not batched nor scheduled
+                getattr(inst, run_method)()
+                self.assertEqual(getattr(inst, result_method)(),
+                                 {'usage': 'id_1'})
+
+            self.assertEqual(
+                [c[1]['parameters']['node_instance_ids']
+                 for c in _client.executions.start.call_args_list],
+                [['id_1']])
+            # result saved for next runs
+            inst.set_runtime_properties.assert_called_once_with({
+                'usage': 'id_1',
+                context.RUNTIME_PROPERTY_CACHE: {
+                    'timestamp': 130, 'operation_inputs': {}}})
+
+    def test_ResourceManagementContext_shared_execution(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for scope, operation_inputs in [('global', {'a': 1}),
+                                        ('global', {'a': 1}),
+                                        ('global', {'a': 2}),
+                                        ('project', {'a': 1})]:
+            _ctx.node_instances.append(self._gen_usage_node_instance(
+                'id_{}'.format(len(_ctx.node_instances)), 'deployment_id', {
+                    'system_name': 'system',
+                    'resource_name': 'resource',
+                    'scope': scope,
+                    context.PROPERTY_OPERATION_INPUTS: operation_inputs
+                }))
+
+        execution_ids = iter(range(10))
+        _client.executions.start = Mock(
+            side_effect=lambda *args, **kwargs: Mock(id=next(execution_ids)))
+
+        inst = context.ResourceManagementContext(_ctx, _client)
+        inst.execution_runner.wait_for_result = Mock(
+            side_effect=lambda execution_id, instance_id: {
+                'usage': instance_id})
+
+        # parallel - execution started once for equivalent instances
+        started = []
+
+        while True:
+            started.append(inst.run_execution(wait=False))
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(started, [0, 0, 1, 2])
+        self.assertEqual(inst.saved_executions, 1)
+
+        inst.select_instance(1)
+        self.assertEqual(inst.get_execution_result(), {'usage': 'id_0'})
+        inst.select_instance(0)
+        self.assertEqual(inst.get_execution_result(), {'usage': 'id_0'})
+        self.assertEqual(
+            inst.execution_runner.wait_for_result.call_args_list,
+            [call(0, 'id_0')])
+
+        # simple - result of first execution reused
+        inst = context.ResourceManagementContext(_ctx, _client)
+        inst.execution_runner.wait_for_result = Mock(
+            side_effect=lambda execution_id, instance_id: {
+                'usage': instance_id})
+        results = []
+
+        while True:
+            results.append(inst.run_execution())
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(
+            results,
+            [{'usage': 'id_0'}, {'usage': 'id_0'}, {'usage': 'id_2'},
+             {'usage': 'id_3'}])
+        self.assertEqual(_client.executions.start.call_count, 6)
+        self.assertEqual(inst.saved_executions, 1)
+
+        # windowed - shared execution tracked for instance which started it
+        inst = context.ResourceManagementContext(_ctx, _client)
+
+        while True:
+            inst.run_windowed_execution()
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(inst._in_flight, OrderedDict([(6, 'id_0'),
+                                                       (7, 'id_2'),
+                                                       (8, 'id_3')]))
+
     def test_ResourceManagementContext_set_value(self):
         inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
 
@@ -77,6 +321,101 @@ class TestContext(unittest.TestCase):
         self.assertEqual(new_value.as_dict(), {
             'usage': 80.0, 'quota': 100.0, 'availability': 20.0})
 
+    def test_ResourceManagementContext_fail_fast(self):
+        inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
+        res_prof = profile.ResourcesProfile.get_profile_from_dict(Mock(), {
+            data.SCOPE_GLOBAL: {
+                "system": {
+                    "resource": "30",
+                    "other": "1"
+                }
+            }
+        })
+        inst.set_fail_fast_profile(res_prof, 'a')
+
+        # availability not known yet
+        inst.set_value(quota=100)
+        self.assertEqual(inst.failed_requirements, [])
+
+        # requirement met
+        inst.set_value(usage=50)
+        inst.set_value(quota=10, resource_name='not_required')
+        inst.set_value(usage=5, resource_name='not_required')
+        self.assertEqual(inst.failed_requirements, [])
+
+        # requirement not met
+        inst.set_value(usage=80)
+        errors = inst.failed_requirements
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(
+            isinstance(errors[0], profile.NoAvailableResourcesError))
+        self.assertEqual(errors[0].availability, 20.0)
+
+    def test_ResourceManagementContext_fail_fast_no_availability(self):
+        inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
+        res_prof = profile.ResourcesProfile.get_profile_from_dict(Mock(), {
+            data.SCOPE_GLOBAL: {
+                "system": {
+                    "resource": "1",
+                    "other": "1"
+                }
+            }
+        })
+        inst.set_fail_fast_profile(res_prof, 'a')
+
+        # computed availability 0
+        inst.set_value(quota=10, usage=10)
+        errors = inst.failed_requirements
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(
+            isinstance(errors[0], profile.NoAvailableResourcesError))
+        self.assertEqual(errors[0].availability, 0.0)
+
+        # availability undetermined for collected quota and usage
+        inst.set_value(quota=-1, usage=10, resource_name='other')
+        errors = inst.failed_requirements
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(
+            isinstance(errors[1], profile.CannotDetermineAvailabilityError))
+
+    def test_ResourceManagementContext_cancel_executions(self):
+        inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
+        inst.execution_runner.cancel_pending = Mock(return_value=['1'])
+
+        self.assertEqual(inst.cancel_executions(), ['1'])
+
+        # scheduled starts are dropped
+        _pool = Mock()
+        inst._execution_pool = _pool
+        inst._execution_starts = {'id': Mock()}
+        self.assertEqual(inst.cancel_executions(), ['1'])
+        _pool.terminate.assert_called_once_with()
+        _pool.join.assert_called_once_with()
+        self.assertEqual(inst._execution_pool, None)
+        self.assertEqual(inst._execution_starts, {})
+
+    def test_ResourceManagementContext_collected_data_cache(self):
+        inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
+        resource_key = data.ResourceKey(
+            data.SCOPE_PROJECT, "system", "resource", "global")
+
+        inst.set_value(quota=100, usage=50)
+        collected_data = inst.collected_data
+        collected_data_dict = inst.collected_data_dict
+        self.assertEqual(collected_data[resource_key].availability, 50.0)
+
+        # no changes - the same views
+        self.assertTrue(inst.collected_data is collected_data)
+        self.assertTrue(inst.collected_data_dict is collected_data_dict)
+
+        # views rebuilt after update
+        inst.set_value(usage=80)
+        self.assertTrue(inst.collected_data is not collected_data)
+        self.assertEqual(
+            inst.collected_data_dict,
+            {'global': {'system': {'resource': {
+                'usage': 80.0, 'quota': 100.0, 'availability': 20.0}}}})
+
     def test_ResourceManagementContext_collected_data(self):
         _ctx = Mock()
         _client = Mock()
@@ -90,7 +429,11 @@ class TestContext(unittest.TestCase):
         ): _ava}
         self.assertEqual(inst.collected_data, {})
 
+        # view is cached till collected data is changed
         _ava.availability = 1.1
+        self.assertEqual(inst.collected_data, {})
+
+        inst._collected_data = dict(inst._collected_data)
         self.assertEqual(inst.collected_data, {data.ResourceKey(
             data.SCOPE_PROJECT, "system", "resource", "a"
         ): _ava})
@@ -120,11 +463,43 @@ class TestContext(unittest.TestCase):
                     'other': {'a': '!'},
                     'resource': {'a': '!'}}}})
 
+    def test_ResourceManagementContext_get_availability_data(self):
+        inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
+        resource_key = data.ResourceKey(
+            data.SCOPE_PROJECT, "system", "resource", "global")
+
+        self.assertEqual(inst.get_availability_data(resource_key), None)
+
+        # index updated by set_value
+        inst.set_value(quota=100, usage=50)
+        self.assertEqual(
+            inst.get_availability_data(resource_key).availability, 50.0)
+        self.assertEqual(inst._project_index.keys(), ['global'])
+
+        # no availability left
+        inst.set_value(quota=10, usage=10, resource_name='other')
+        self.assertEqual(
+            inst.get_availability_data(data.ResourceKey(
+                data.SCOPE_PROJECT, "system", "other", "global")
+            ).availability,
+            0.0)
+
+        # index rebuilt for replaced data
+        inst._collected_data = {data.ResourceKey(
+            data.SCOPE_PROJECT, "system", "resource", "a"
+        ): data.ResourceAvailability(10, 1)}
+        self.assertEqual(inst.get_availability_data(resource_key), None)
+        self.assertEqual(
+            inst.get_availability_data(data.ResourceKey(
+                data.SCOPE_PROJECT, "system", "resource", "a")).availability,
+            9.0)
+
     def _gen_resource_instance(self):
         _instances_ctx = Mock()
         _instances_ctx.id = 'id'
         _instances_ctx._node_instance.deployment_id = 'deployment_id'
-        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root', 'a']
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              context.NODE_TYPE_PROJECT]
         _instances_ctx.node.properties = {'system_name': 'system',
                                           'resource_name': 'resource',
                                           'scope': 'scope',
@@ -189,10 +564,18 @@ class TestContext(unittest.TestCase):
         current_properties = {}
         inst.set_runtime_properties(current_properties, update=True)
         self.assertEqual(current_properties, {'a': 'b'})
-        _client.node_instances.get.assert_called_with('id')
+        _client.node_instances.get.assert_called_with(
+            'id', _include=['version', 'runtime_properties'])
         _client.node_instances.update.assert_called_with(
             'id', runtime_properties={'a': 'b'}, version=11)
 
+        # without update only version requested
+        inst.set_runtime_properties({'c': 'd'})
+        _client.node_instances.get.assert_called_with(
+            'id', _include=['version'])
+        _client.node_instances.update.assert_called_with(
+            'id', runtime_properties={'c': 'd'}, version=11)
+
     def test_ResourceManagementContext_resolve_project(self):
         inst, _client, _ctx, _instances_ctx = self._gen_resource_instance()
 
@@ -214,7 +597,9 @@ class TestContext(unittest.TestCase):
         _cfy_instance.id = 'id'
         _cfy_instance.deployment_id = 'deployment_id'
         _cfy_instance.node_id = 'node_id'
-        _cfy_node.type_hierarchy = ['cloudify.nodes.Root', 'a']
+        _cfy_node.id = 'node_id'
+        _cfy_node.type_hierarchy = ['cloudify.nodes.Root',
+                                    'cloudify.nodes.resource_management.Quota']
         _cfy_node.properties = {'system_name': 'system',
                                 'resource_name': 'resource',
                                 'scope': 'scope',
@@ -222,13 +607,744 @@ class TestContext(unittest.TestCase):
         _cfy_instance.runtime_properties = {'resource': 'b',
                                             'c': 'd'}
 
-        _client.node_instances.list = Mock(return_value=[_cfy_instance])
-        _client.nodes.get = Mock(return_value=_cfy_node)
+        _client.node_instances.list = Mock(
+            return_value=_list_response([_cfy_instance]))
+        _client.nodes.list = Mock(return_value=[_cfy_node])
         self.assertTrue(inst.resolve_project())
         next_instance = inst.next_instance()
         self.assertEqual(next_instance['project'], 'proj')
         self.assertTrue(next_instance['visited'])
 
+    def _gen_project_instance(self, project_name, deployment_id):
+        _instances_ctx = Mock()
+        _instances_ctx.id = project_name
+        _instances_ctx._node_instance.deployment_id = 'deployment_id'
+        _instances_ctx.node.type_hierarchy = [
+            'cloudify.nodes.Root',
+            context.NODE_TYPE_PROJECT
+        ]
+        _instances_ctx.node.properties = {
+            context.PROPERTY_PROJECT_NAME: project_name,
+            context.PROPERTY_DEPLOYMENT_ID: deployment_id
+        }
+        _instances_ctx._node_instance.runtime_properties = {}
+        return _instances_ctx
+
+    def test_ResourceManagementContext_prefetch_projects(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = [
+            self._gen_project_instance('proj_{}'.format(i),
+                                       'depl_{}'.format(i))
+            for i in range(5)
+        ]
+
+        def list_instances(deployment_id, **kwargs):
+            _cfy_instance = Mock()
+            _cfy_instance.id = 'id_' + deployment_id
+            _cfy_instance.deployment_id = deployment_id
+            _cfy_instance.node_id = 'node_id'
+            _cfy_instance.runtime_properties = {}
+            return _list_response([_cfy_instance])
+
+        _cfy_node = Mock()
+        _cfy_node.id = 'node_id'
+        _cfy_node.type_hierarchy = ['cloudify.nodes.Root',
+                                    'cloudify.nodes.resource_management.Quota']
+        _cfy_node.properties = {}
+        _client.node_instances.list = Mock(side_effect=list_instances)
+        _client.nodes.list = Mock(return_value=[_cfy_node])
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 project_workers=3)
+
+        # next projects (one per worker) loaded during first resolve
+        self.assertTrue(inst.resolve_project())
+        self.assertEqual(_client.node_instances.list.call_count, 3)
+        self.assertEqual(
+            sorted(inst._project_instances.keys()),
+            ['depl_1', 'depl_2'])
+
+        while inst.next_instance():
+            if inst.instance.type == context.NODE_TYPE_PROJECT:
+                self.assertTrue(inst.resolve_project())
+
+            if inst.instance.id == 'proj_3':
+                self.assertEqual(_client.node_instances.list.call_count, 5)
+                self.assertEqual(inst._project_instances.keys(), ['depl_4'])
+
+        # no more requests, projects added in original order
+        self.assertEqual(_client.node_instances.list.call_count, 5)
+        self.assertEqual(inst._project_instances, {})
+        self.assertEqual(
+            [i.id for i in inst._instances.instances][5:],
+            ['id_depl_{}'.format(i) for i in range(5)])
+
+        # project defined twice - loaded directly
+        self.assertTrue(inst.reset())
+        self.assertTrue(inst.resolve_project())
+        self.assertEqual(_client.node_instances.list.call_count, 6)
+
+        # without prefetch - instances streamed on each resolve
+        _client.node_instances.list.reset_mock()
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 project_workers=1)
+        self.assertTrue(inst.resolve_project())
+        _client.node_instances.list.assert_called_once_with(
+            deployment_id='depl_0', node_id=['node_id'],
+            _offset=0, _size=1000,
+            _include=['id', 'node_id', 'deployment_id',
+                      'runtime_properties'])
+        self.assertEqual(inst._project_instances, {})
+
+        # invalid page size - one instance per request
+        _client.node_instances.list.reset_mock()
+        for page_size in [0, -5]:
+            inst = context.ResourceManagementContext(_ctx, _client,
+                                                     project_workers=1,
+                                                     page_size=page_size)
+            self.assertEqual(inst._page_size, 1)
+            self.assertTrue(inst.resolve_project())
+            self.assertEqual(_client.node_instances.list.call_args[1]['_size'],
+                             1)
+
+    def _gen_resource_node_instance(self, node_type, system_name,
+                                    resource_name):
+        _instances_ctx = Mock()
+        _instances_ctx.id = '{0}_{1}'.format(system_name, resource_name)
+        _instances_ctx._node_instance.deployment_id = 'deployment_id'
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              node_type]
+        _instances_ctx.node.properties = {'system_name': system_name,
+                                          'resource_name': resource_name}
+        _instances_ctx._node_instance.runtime_properties = {}
+        return _instances_ctx
+
+    def _gen_usage_node_instance(self, instance_id, deployment_id='a',
+                                 properties=None, runtime_properties=None,
+                                 node_id=None):
+        _instances_ctx = Mock()
+        _instances_ctx.id = instance_id
+        _instances_ctx._node_instance.deployment_id = deployment_id
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              context.NODE_TYPE_USAGE]
+        _instances_ctx.node.properties = {'runtime_property_name': 'usage'}
+        _instances_ctx.node.properties.update(properties or {})
+        _instances_ctx._node_instance.runtime_properties = \
+            runtime_properties or {}
+
+        if node_id is not None:
+            _instances_ctx.node_id = node_id
+
+        return _instances_ctx
+
+    def test_ResourceManagementContext_required_resources(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = [
+            self._gen_project_instance('proj_a', 'depl_a'),
+            self._gen_project_instance('proj_b', 'depl_b'),
+            self._gen_resource_node_instance(
+                context.NODE_TYPE_QUOTA, 'system', 'resource'),
+            self._gen_resource_node_instance(
+                context.NODE_TYPE_QUOTA, 'system', 'other'),
+            self._gen_resource_node_instance(
+                context.NODE_TYPE_USAGE, 'system', None),
+            self._gen_resource_node_instance(
+                context.NODE_TYPE_USAGE, 'other', None),
+            self._gen_resource_node_instance(
+                'cloudify.nodes.resource_management.Result', None, None)
+        ]
+        _client.node_instances.list = Mock(return_value=[])
+        _client.nodes.list = Mock(return_value=[])
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 project_workers=3)
+
+        # no requirements - everything is processed
+        self.assertTrue(all(
+            inst.is_required(instance, project)
+            for instance, project in inst._instances.iter_instances()))
+
+        inst.set_required_resources([
+            data.ResourceKey(data.SCOPE_PROJECT, 'system', 'x', 'proj_a'),
+            data.ResourceKey(data.SCOPE_GLOBAL, 'system', 'resource',
+                             data.SCOPE_GLOBAL)
+        ])
+        self.assertEqual(
+            [instance.id
+             for instance, project in inst._instances.iter_instances()
+             if inst.is_required(instance, project)],
+            ['proj_a', 'system_resource', 'system_None', 'None_None'])
+
+        # current instance is checked by default
+        self.assertTrue(inst.is_required())
+        inst.next_instance()
+        self.assertFalse(inst.is_required())
+
+        # only required project is prefetched
+        self.assertEqual(inst.prefetch_projects(), ['depl_a'])
+
+    def test_ResourceManagementContext_batch_execution(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for deployment_id, operation_inputs in [('a', {}),
+                                                ('a', {'x': 1}),
+                                                ('b', {}),
+                                                ('a', {}),
+                                                ('a', {}),
+                                                ('a', {'x': 1})]:
+            _ctx.node_instances.append(self._gen_usage_node_instance(
+                'id_{}'.format(len(_ctx.node_instances)), deployment_id,
+                {context.PROPERTY_OPERATION_INPUTS: operation_inputs}))
+
+        execution_ids = iter(range(10))
+
+        def start_execution(*args, **kwargs):
+            _execution = Mock()
+            _execution.id = next(execution_ids)
+            return _execution
+
+        def list_instances(id, **kwargs):
+            result = []
+
+            for instance_id in id:
+                _instance = Mock()
+                _instance.id = instance_id
+                _instance.runtime_properties = {'usage': instance_id}
+                result.append(_instance)
+
+            return result
+
+        _client.executions.start = Mock(side_effect=start_execution)
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id, 'status': 'terminated'}
+            for execution_id in id
+        ])
+        _client.node_instances.list = Mock(side_effect=list_instances)
+
+        inst = context.ResourceManagementContext(_ctx, _client, batch_size=2)
+        execution_ids_by_instance = {}
+
+        while True:
+            execution_ids_by_instance[inst.instance.id] = \
+                inst.run_batch_execution()
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(execution_ids_by_instance, {
+            'id_0': 0, 'id_3': 0,
+            'id_1': 1, 'id_5': 1,
+            'id_2': 2,
+            'id_4': 3})
+        self.assertEqual(
+            [c[0][:2] for c in _client.executions.start.call_args_list],
+            [('a', 'execute_operation'),
+             ('a', 'execute_operation'),
+             ('b', 'execute_operation'),
+             ('a', 'execute_operation')])
+        self.assertEqual(
+            _client.executions.start.call_args_list[1][1]['parameters'][
+                'node_instance_ids'],
+            ['id_1', 'id_5'])
+
+        inst.reset()
+        results = {}
+
+        while True:
+            results[inst.instance.id] = inst.get_batch_execution_result()
+            self.assertEqual(inst.instance.execution_id, None)
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(
+            results,
+            dict(('id_{}'.format(i), {'usage': 'id_{}'.format(i)})
+                 for i in range(6)))
+        # statuses of all executions refreshed by one request
+        self.assertEqual(_client.executions.list.call_count, 1)
+        self.assertEqual(_client.node_instances.list.call_count, 4)
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_windowed_execution(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for i in range(5):
+            _ctx.node_instances.append(
+                self._gen_usage_node_instance('id_{}'.format(i)))
+
+        execution_ids = iter(range(10))
+        statuses = {}
+
+        def start_execution(*args, **kwargs):
+            # window never exceeded
+            self.assertTrue(len(inst._in_flight) < 2)
+            _execution = Mock()
+            _execution.id = next(execution_ids)
+            statuses[_execution.id] = 'started'
+            return _execution
+
+        def list_executions(id, **kwargs):
+            result = [
+                {'id': execution_id, 'status': statuses[execution_id]}
+                for execution_id in id
+            ]
+            # executions end one by one
+            statuses[min(id)] = 'failed' if min(id) == 3 else 'terminated'
+            return result
+
+        def list_instances(id, **kwargs):
+            result = []
+
+            for instance_id in id:
+                _instance = Mock()
+                _instance.id = instance_id
+                _instance.runtime_properties = {'usage': instance_id}
+                result.append(_instance)
+
+            return result
+
+        _client.executions.start = Mock(side_effect=start_execution)
+        _client.executions.list = Mock(side_effect=list_executions)
+        _client.node_instances.list = Mock(side_effect=list_instances)
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 max_in_flight=2)
+
+        while True:
+            inst.run_windowed_execution()
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(_client.executions.start.call_count, 5)
+        self.assertEqual(inst._in_flight, OrderedDict([(3, 'id_3'),
+                                                       (4, 'id_4')]))
+        # results fetched as soon as executions ended
+        self.assertEqual(sorted(inst._window_results.keys()),
+                         ['id_0', 'id_1', 'id_2'])
+
+        inst.reset()
+        results = {}
+
+        while True:
+            if inst.instance.id == 'id_3':
+                with self.assertRaises(RuntimeError):
+                    inst.get_windowed_execution_result()
+            else:
+                results[inst.instance.id] = \
+                    inst.get_windowed_execution_result()
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(
+            results,
+            dict(('id_{}'.format(i), {'usage': 'id_{}'.format(i)})
+                 for i in [0, 1, 2, 4]))
+        self.assertEqual(inst._in_flight, OrderedDict())
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_windowed_shared_execution(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = [
+            self._gen_usage_node_instance('id_{}'.format(i), properties={
+                'system_name': 'system',
+                'resource_name': 'resource',
+                'scope': 'global'
+            })
+            for i in range(3)
+        ]
+
+        _client.executions.start = Mock(return_value=Mock(id='0'))
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id, 'status': 'terminated'}
+            for execution_id in id
+        ])
+        # runtime properties differ for each instance
+        _client.node_instances.list = Mock(side_effect=lambda id, **kwargs: [
+            Mock(id=instance_id, runtime_properties={'usage': instance_id})
+            for instance_id in id
+        ])
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 max_in_flight=1)
+        started = []
+
+        while True:
+            started.append(inst.run_windowed_execution())
+            # shared execution takes no place in window
+            self.assertTrue(len(inst._in_flight) <= 1)
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(started, ['0', '0', '0'])
+        self.assertEqual(_client.executions.start.call_count, 1)
+        self.assertEqual(inst._in_flight, OrderedDict([('0', 'id_0')]))
+
+        # result of instance which started execution used by all of them
+        self.assertEqual(self._get_windowed_results(inst),
+                         dict(('id_{}'.format(i), {'usage': 'id_0'})
+                              for i in range(3)))
+        self.assertEqual(
+            [c[1]['id'] for c in _client.node_instances.list.call_args_list],
+            [['id_0']])
+
+    def _gen_windowed_context(self, expire_after=None, **kwargs):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for i in range(5):
+            _ctx.node_instances.append(
+                self._gen_usage_node_instance('id_{}'.format(i)))
+
+        execution_ids = iter(range(10))
+
+        # executions never end
+        _client.executions.start = Mock(
+            side_effect=lambda *args, **kwargs: Mock(
+                id=str(next(execution_ids))))
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id, 'status': 'started'}
+            for execution_id in id
+        ])
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 max_in_flight=2,
+                                                 jitter=0, **kwargs)
+        started = []
+
+        while True:
+            if len(started) == expire_after:
+                # workflow time budget exhausted
+                inst.execution_runner.poller._deadline = 0
+
+            started.append(inst.run_windowed_execution())
+
+            if not inst.next_instance():
+                break
+
+        return inst, _client, started
+
+    def _get_windowed_results(self, inst):
+        inst.reset()
+        results = {}
+
+        while True:
+            results[inst.instance.id] = inst.get_windowed_execution_result()
+            self.assertEqual(inst.instance.execution_id, None)
+
+            if not inst.next_instance():
+                break
+
+        return results
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_windowed_execution_timeout(self):
+        inst, _client, started = self._gen_windowed_context(timeout=0)
+
+        # the oldest execution not tracked to make place for next one,
+        # slow executions are not cancelled
+        self.assertEqual(started, ['0', '1', '2', '3', '4'])
+        _client.executions.cancel.assert_not_called()
+        self.assertEqual(inst._in_flight,
+                         OrderedDict([('3', 'id_3'), ('4', 'id_4')]))
+
+        # timed out executions are not waited for, results undetermined
+        _client.executions.list.reset_mock()
+        self.assertEqual(self._get_windowed_results(inst),
+                         dict(('id_{}'.format(i), {}) for i in range(5)))
+        self.assertEqual(
+            [c[1]['id'] for c in _client.executions.list.call_args_list],
+            [['0', '1', '2', '3', '4'], ['0', '1', '2', '3', '4']])
+        _client.node_instances.get.assert_not_called()
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_windowed_execution_budget(self):
+        inst, _client, started = self._gen_windowed_context(
+            workflow_timeout=0)
+
+        # time budget exhausted before first start
+        self.assertEqual(started, [None] * 5)
+        _client.executions.start.assert_not_called()
+        _client.executions.cancel.assert_not_called()
+        self.assertEqual(self._get_windowed_results(inst),
+                         dict(('id_{}'.format(i), {}) for i in range(5)))
+
+        inst, _client, started = self._gen_windowed_context(expire_after=2)
+
+        # time budget exhausted - window is not exceeded, executions left
+        # running are cancelled
+        self.assertEqual(started, ['0', '1', None, None, None])
+        self.assertEqual(_client.executions.start.call_count, 2)
+        self.assertEqual(
+            [c[0][0] for c in _client.executions.cancel.call_args_list],
+            ['0', '1'])
+        self.assertEqual(inst._in_flight,
+                         OrderedDict([('0', 'id_0'), ('1', 'id_1')]))
+
+        # not started executions reported as undetermined
+        self.assertEqual(self._get_windowed_results(inst),
+                         dict(('id_{}'.format(i), {}) for i in range(5)))
+        self.assertEqual(inst._in_flight, OrderedDict())
+        self.assertEqual(_client.executions.start.call_count, 2)
+
+    def test_ResourceManagementContext_time_budget(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = [self._gen_usage_node_instance('id_0'),
+                               self._gen_usage_node_instance('id_1')]
+        _client.executions.start = Mock(return_value=Mock(id='0'))
+
+        with patch('time.time', Mock(return_value=100)):
+            inst = context.ResourceManagementContext(_ctx, _client,
+                                                     workflow_timeout=10)
+            self.assertEqual(inst.run_execution(wait=False), '0')
+
+        # time budget exhausted - execution not started, executions left
+        # running are cancelled once
+        inst.next_instance()
+
+        with patch('time.time', Mock(return_value=111)):
+            self.assertEqual(inst.run_execution(wait=False), None)
+            self.assertEqual(inst.run_execution(), {})
+
+        self.assertEqual(_client.executions.start.call_count, 1)
+        _client.executions.cancel.assert_called_once_with('0')
+
+        # nothing started in other modes
+        for run_method, result_method in [
+                ('run_batch_execution', 'get_batch_execution_result'),
+                ('run_concurrent_execution',
+                 'get_concurrent_execution_result')]:
+            _client.executions.start.reset_mock()
+            inst = context.ResourceManagementContext(_ctx, _client,
+                                                     workflow_timeout=0)
+
+            while True:
+                getattr(inst, run_method)()
+
+                if not inst.next_instance():
+                    break
+
+            inst.reset()
+
+            while True:
+                self.assertEqual(getattr(inst, result_method)(), {})
+
+                if not inst.next_instance():
+                    break
+
+            _client.executions.start.assert_not_called()
+
+    def test_ResourceManagementContext_windowed_execution_order(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for i in range(4):
+            _ctx.node_instances.append(self._gen_usage_node_instance(
+                'id_{}'.format(i), node_id='node_{}'.format(i)))
+
+        # durations saved by previous run
+        _instances_ctx = Mock()
+        _instances_ctx.id = 'result'
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              context.NODE_TYPE_RESULT]
+        _instances_ctx.node.properties = {}
+        _instances_ctx._node_instance.runtime_properties = {
+            context.RUNTIME_PROPERTY_DURATIONS: {
+                'node_0': 1, 'node_1': 5, 'node_2': 10}}
+        _ctx.node_instances.append(_instances_ctx)
+
+        execution_ids = iter(range(10))
+        _client.executions.start = Mock(
+            side_effect=lambda *args, **kwargs: Mock(id=next(execution_ids)))
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 max_in_flight=10)
+        self.assertEqual(inst.execution_durations,
+                         {'node_0': 1.0, 'node_1': 5.0, 'node_2': 10.0})
+
+        started = []
+
+        while True:
+            if inst.instance.type == context.NODE_TYPE_USAGE:
+                started.append(inst.run_windowed_execution())
+                # current instance is not changed
+                self.assertEqual(inst.position, len(started) - 1)
+
+            if not inst.next_instance():
+                break
+
+        # unknown duration first, then the longest ones
+        self.assertEqual(started, [0, 1, 2, 3])
+        self.assertEqual(
+            [c[1]['parameters']['node_instance_ids']
+             for c in _client.executions.start.call_args_list],
+            [['id_3'], ['id_2'], ['id_1'], ['id_0']])
+        self.assertEqual(
+            inst._in_flight,
+            OrderedDict([(0, 'id_3'), (1, 'id_2'), (2, 'id_1'),
+                         (3, 'id_0')]))
+        self.assertEqual(
+            dict((i.id, i.execution_id) for i in inst._instances.instances
+                 if i.type == context.NODE_TYPE_USAGE),
+            {'id_0': 3, 'id_1': 2, 'id_2': 1, 'id_3': 0})
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_concurrent_execution(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = []
+
+        for i in range(4):
+            _ctx.node_instances.append(
+                self._gen_usage_node_instance('id_{}'.format(i)))
+
+        def start_execution(deployment_id, workflow_id, parameters,
+                            **kwargs):
+            _execution = Mock()
+            _execution.id = parameters['node_instance_ids'][0]
+            return _execution
+
+        def get_instance(instance_id, **kwargs):
+            _instance = Mock()
+            _instance.runtime_properties = {'usage': instance_id}
+            return _instance
+
+        _client.executions.start = Mock(side_effect=start_execution)
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id,
+             'status': 'failed' if execution_id == 'id_2' else 'terminated'}
+            for execution_id in id
+        ])
+        _client.node_instances.get = Mock(side_effect=get_instance)
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 execution_workers=3)
+
+        while True:
+            inst.run_concurrent_execution()
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(sorted(inst._execution_starts.keys()),
+                         ['id_0', 'id_1', 'id_2', 'id_3'])
+
+        inst.reset()
+        results = {}
+
+        while True:
+            if inst.instance.id == 'id_2':
+                with self.assertRaises(RuntimeError):
+                    inst.get_concurrent_execution_result()
+            else:
+                results[inst.instance.id] = \
+                    inst.get_concurrent_execution_result()
+
+            self.assertEqual(inst.instance.execution_id, None)
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(
+            results,
+            dict(('id_{}'.format(i), {'usage': 'id_{}'.format(i)})
+                 for i in [0, 1, 3]))
+        self.assertEqual(_client.executions.start.call_count, 4)
+        self.assertEqual(_client.node_instances.get.call_count, 3)
+        # nothing pending - pool closed
+        self.assertEqual(inst._execution_pool, None)
+
+        # workers log messages for their own node instances
+        for i in range(4):
+            self.assertIn(
+                call('[id_{0}] Got execution ID: id_{0}'.format(i)),
+                _ctx.logger.debug.call_args_list)
+
+    @patch('time.sleep', Mock())
+    def test_ResourceManagementContext_concurrent_execution_order(self):
+        _ctx = Mock()
+        _client = Mock()
+        _ctx.node_instances = [
+            self._gen_usage_node_instance('id_{}'.format(i), properties={
+                'system_name': 'system',
+                'resource_name': 'resource_{}'.format(i % 3),
+                'scope': 'global'
+            })
+            for i in range(4)
+        ]
+
+        # the first execution ends last
+        finish_order = ['id_1', 'id_2', 'id_0']
+        finished = set()
+
+        def list_executions(id, **kwargs):
+            finished.add(finish_order[len(finished)])
+            return [
+                {'id': execution_id,
+                 'status': 'terminated' if execution_id in finished
+                 else 'started'}
+                for execution_id in id
+            ]
+
+        _client.executions.start = Mock(
+            side_effect=lambda deployment_id, workflow_id, parameters,
+            **kwargs: Mock(id=parameters['node_instance_ids'][0]))
+        _client.executions.list = Mock(side_effect=list_executions)
+        _client.node_instances.get = Mock(
+            side_effect=lambda instance_id, **kwargs: Mock(
+                runtime_properties={'usage': instance_id}))
+
+        inst = context.ResourceManagementContext(_ctx, _client,
+                                                 execution_workers=3)
+
+        while True:
+            inst.run_concurrent_execution()
+
+            if not inst.next_instance():
+                break
+
+        # execution shared with equivalent instance
+        self.assertEqual(sorted(inst._execution_starts.keys()),
+                         ['id_0', 'id_1', 'id_2'])
+        self.assertEqual(inst.saved_executions, 1)
+
+        for start in inst._execution_starts.values():
+            start.wait()
+
+        inst.reset()
+        self.assertEqual(inst.get_concurrent_execution_result(),
+                         {'usage': 'id_0'})
+        # results of executions ended earlier fetched in meantime
+        self.assertEqual(sorted(inst._execution_results.keys()),
+                         ['id_1', 'id_2'])
+
+        results = {'id_0': {'usage': 'id_0'}}
+
+        while inst.next_instance():
+            results[inst.instance.id] = inst.get_concurrent_execution_result()
+
+        self.assertEqual(results, {
+            'id_0': {'usage': 'id_0'},
+            'id_1': {'usage': 'id_1'},
+            'id_2': {'usage': 'id_2'},
+            'id_3': {'usage': 'id_0'}})
+        self.assertEqual(_client.executions.start.call_count, 3)
+        self.assertEqual(_client.node_instances.get.call_count, 3)
+        self.assertEqual(inst._execution_pool, None)
+
 
 if __name__ == '__main__':
     unittest.main()
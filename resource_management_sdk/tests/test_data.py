@@ -68,6 +68,25 @@ class TestData(unittest.TestCase):
             hash(second),
         )
 
+    def test_resource_key_interned(self):
+        one = data.ResourceKey('global', 'b', 'c')
+        self.assertTrue(one is data.ResourceKey('global', 'b', 'c'))
+        self.assertTrue(one is not data.ResourceKey('a', 'b', 'c'))
+        self.assertTrue(
+            one.get_project_resource_key('n') is
+            data.ResourceKey('global', 'b', 'c', 'global'))
+
+        # equal keys with different scope
+        self.assertEqual(data.ResourceKey('a', 'b', 'c', 'd'),
+                         data.ResourceKey('global', 'b', 'c', 'd'))
+        self.assertFalse(data.ResourceKey('a', 'b', 'c', 'd') !=
+                         data.ResourceKey('global', 'b', 'c', 'd'))
+        self.assertNotEqual(data.ResourceKey('a', 'b', 'c', 'd'),
+                            data.ResourceKey('a', 'b', 'c', 'e'))
+
+        with self.assertRaises(AttributeError):
+            one.extra = 1
+
     def test_resource_key_get_project_resource_key(self):
         other = data.ResourceKey('a', 'b', 'c', 'n')
         self.assertEqual(
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import itertools
 import unittest
 from mock import Mock, patch
 
@@ -21,39 +22,183 @@ import resource_management_sdk.execution as execution
 
 class TestExecution(unittest.TestCase):
 
+    @patch('time.sleep', Mock())
+    def test_ExecutionStatusPoller_run(self):
+        _client = Mock()
+        poller = execution.ExecutionStatusPoller(Mock(), _client)
+
+        # success
+        _client.executions.get = Mock(return_value={'status': 'terminated'})
+        self.assertTrue(poller.run('abc-bcd'))
+        _client.executions.get.assert_called_with(
+            execution_id='abc-bcd', _include=['id', 'status'])
+
+        # failed
+        _client.executions.get = Mock(return_value={'status': 'failed'})
+        with self.assertRaises(RuntimeError):
+            poller.run('abc-bcd')
+
+        # exeption in communication
+        _client.executions.get = Mock(side_effect=CloudifyClientError('abc'))
+        with self.assertRaises(RuntimeError):
+            poller.run('abc-bcd')
+
     @patch('time.sleep', Mock())
     def test_ExecutionRunner_get_runtime_properties(self):
         _client = Mock()
         exec_inst = execution.ExecutionRunner(Mock(), _client)
 
+        def list_executions(status):
+            return Mock(side_effect=lambda id, **kwargs: [
+                {'id': execution_id, 'status': status}
+                for execution_id in id
+            ])
+
         # success
-        _client.executions.get = Mock(return_value={'status': 'terminated'})
+        _client.executions.list = list_executions('terminated')
         self.assertTrue(exec_inst._check_execution_status('abc-bcd'))
+        _client.executions.list.assert_called_with(
+            id=['abc-bcd'], _include=['id', 'status'])
 
         # failed
-        _client.executions.get = Mock(return_value={'status': 'failed'})
+        _client.executions.list = list_executions('failed')
         with self.assertRaises(RuntimeError):
-            exec_inst._check_execution_status('abc-bcd')
+            exec_inst._check_execution_status('abc-bcd-failed')
 
         # unknow
-        _client.executions.get = Mock(return_value={'status': 'unknow'})
+        _client.executions.list = list_executions('unknow')
         fake_time_values = [480, 240, 120, 60, 0]
 
         def fake_time(*_):
             return fake_time_values.pop()
 
         with patch('time.time', fake_time):
-            self.assertFalse(exec_inst._check_execution_status('abc-bcd'))
+            self.assertFalse(
+                exec_inst._check_execution_status('abc-bcd-unknow'))
 
         # no status
-        _client.executions.get = Mock(return_value={'status': None})
+        _client.executions.list = list_executions(None)
+        with self.assertRaises(RuntimeError):
+            self.assertFalse(
+                exec_inst._check_execution_status('abc-bcd-no-status'))
+
+        # no such execution
+        _client.executions.list = Mock(return_value=[])
         with self.assertRaises(RuntimeError):
-            self.assertFalse(exec_inst._check_execution_status('abc-bcd'))
+            self.assertFalse(
+                exec_inst._check_execution_status('abc-bcd-not-found'))
 
         # exeption in communication
-        _client.executions.get = Mock(side_effect=CloudifyClientError('abc'))
+        _client.executions.list = Mock(side_effect=CloudifyClientError('abc'))
         with self.assertRaises(RuntimeError):
-            self.assertFalse(exec_inst._check_execution_status('abc-bcd'))
+            self.assertFalse(
+                exec_inst._check_execution_status('abc-bcd-error'))
+
+    @patch('time.sleep', Mock())
+    def test_MultiExecutionStatusPoller(self):
+        _client = Mock()
+        poller = execution.MultiExecutionStatusPoller(Mock(), _client)
+        statuses = {'1': 'started', '2': 'started', '3': 'started'}
+
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id, 'status': statuses[execution_id]}
+            for execution_id in id
+        ])
+
+        for execution_id in sorted(statuses.keys()):
+            poller.add(execution_id)
+
+        # nothing finished
+        self.assertEqual(poller.poll(), [])
+        self.assertEqual(poller.pending, set(['1', '2', '3']))
+
+        # completions handed back as they happen
+        statuses['2'] = 'terminated'
+        statuses['3'] = 'failed'
+        self.assertEqual(poller.poll(), ['2', '3'])
+        self.assertEqual(poller.pending, set(['1']))
+        _client.executions.list.assert_called_with(
+            id=['1', '2', '3'], _include=['id', 'status'])
+
+        # one request for all tracked executions on each attempt
+        _client.executions.list.reset_mock()
+        fake_time_values = [60, 30, 0]
+
+        def fake_time(*_):
+            if len(fake_time_values) == 2:
+                statuses['1'] = 'terminated'
+            return fake_time_values.pop()
+
+        with patch('time.time', fake_time):
+            self.assertTrue(poller.run('1'))
+        self.assertEqual(poller.get_finish_time('1'), 60)
+
+        self.assertEqual(_client.executions.list.call_count, 2)
+        _client.executions.list.assert_called_with(
+            id=['1'], _include=['id', 'status'])
+
+        # already finished - no requests
+        _client.executions.list.reset_mock()
+        self.assertTrue(poller.run('2'))
+        with self.assertRaises(RuntimeError):
+            poller.run('3')
+        _client.executions.list.assert_not_called()
+
+    def test_MultiExecutionStatusPoller_id_filter_size(self):
+        _client = Mock()
+        poller = execution.MultiExecutionStatusPoller(Mock(), _client)
+        execution_ids = ['{:03}'.format(i) for i in range(250)]
+
+        _client.executions.list = Mock(side_effect=lambda id, **kwargs: [
+            {'id': execution_id, 'status': 'terminated'}
+            for execution_id in id
+        ])
+
+        for execution_id in execution_ids:
+            poller.add(execution_id)
+
+        # ids sent in query string - limited number of ids in one request
+        self.assertEqual(poller.poll(), execution_ids)
+        self.assertEqual(
+            [c[1]['id'] for c in _client.executions.list.call_args_list],
+            [execution_ids[:100], execution_ids[100:200],
+             execution_ids[200:]])
+
+    @patch('time.sleep')
+    def test_MultiExecutionStatusPoller_workflow_timeout(self, _sleep):
+        _client = Mock()
+        _client.executions.list = Mock(return_value=[
+            {'id': '1', 'status': 'started'},
+            {'id': '2', 'status': 'started'}])
+        now = [0]
+
+        def fake_sleep(interval):
+            now[0] += interval
+
+        _sleep.side_effect = fake_sleep
+
+        with patch('time.time', lambda: now[0]):
+            poller = execution.MultiExecutionStatusPoller(
+                Mock(), _client, workflow_timeout=100, jitter=0)
+            poller.add('1')
+            poller.add('2')
+            now[0] = 10
+
+            # waiting limited by time budget, not by execution timeout
+            self.assertFalse(poller.is_expired())
+            self.assertFalse(poller.run('1'))
+            self.assertEqual(now[0], 100)
+            self.assertFalse(poller.is_expired())
+
+            # budget exhausted - only one status check, no waiting
+            _client.executions.list.reset_mock()
+            _sleep.reset_mock()
+            now[0] = 101
+            self.assertTrue(poller.is_expired())
+            self.assertFalse(poller.run('2'))
+            _client.executions.list.assert_called_once_with(
+                id=['1', '2'], _include=['id', 'status'])
+            _sleep.assert_not_called()
 
     @patch('time.sleep', Mock())
     def test_ExecutionRunner_run_and_wait_for_result(self):
@@ -62,7 +207,8 @@ class TestExecution(unittest.TestCase):
         _execution_start_mock.id = "1234"
         exec_inst = execution.ExecutionRunner(Mock(), _client)
 
-        _client.executions.get = Mock(return_value={'status': 'unknow'})
+        _client.executions.list = Mock(
+            return_value=[{'id': '1234', 'status': 'unknow'}])
         _client.executions.start = Mock(return_value=_execution_start_mock)
         fake_time_values = [480, 240, 120, 60, 0]
 
@@ -77,6 +223,152 @@ class TestExecution(unittest.TestCase):
                                                   'operation_inputs'),
                 {})
 
+    def test_ExecutionRunner_batch(self):
+        _client = Mock()
+        _execution_start_mock = Mock()
+        _execution_start_mock.id = "1234"
+        _client.executions.start = Mock(return_value=_execution_start_mock)
+        _client.executions.list = Mock(
+            return_value=[{'id': '1234', 'status': 'terminated'}])
+        _instances = []
+
+        for i in range(2):
+            _instance = Mock()
+            _instance.id = 'id_{}'.format(i)
+            _instance.runtime_properties = {'usage': i}
+            _instances.append(_instance)
+
+        _client.node_instances.list = Mock(return_value=_instances)
+        exec_inst = execution.ExecutionRunner(Mock(), _client)
+
+        self.assertEqual(
+            exec_inst.run_batch('deployment_id', ['id_0', 'id_1', 'id_2'],
+                                'list', {'a': 'b'}),
+            '1234')
+        _client.executions.start.assert_called_once_with(
+            'deployment_id', 'execute_operation',
+            allow_custom_parameters=True, force=True,
+            parameters={
+                'node_instance_ids': ['id_0', 'id_1', 'id_2'],
+                'operation_kwargs': {'a': 'b'},
+                'allow_kwargs_override': True,
+                'operation': 'list'})
+
+        self.assertEqual(
+            exec_inst.wait_for_results('1234', ['id_0', 'id_1', 'id_2']),
+            {'id_0': {'usage': 0}, 'id_1': {'usage': 1}, 'id_2': {}})
+        _client.node_instances.list.assert_called_once_with(
+            id=['id_0', 'id_1', 'id_2'],
+            _include=['id', 'runtime_properties'])
+
+        # failed execution
+        _client.executions.list = Mock(
+            return_value=[{'id': '1235', 'status': 'failed'}])
+        with self.assertRaises(RuntimeError):
+            exec_inst.wait_for_results('1235', ['id_0'])
+
+        # ids sent in query string - limited number of ids in one request
+        instance_ids = ['id_{:03}'.format(i) for i in range(150)]
+        _client.executions.list = Mock(
+            return_value=[{'id': '1236', 'status': 'terminated'}])
+        _client.node_instances.list = Mock(return_value=[])
+        self.assertEqual(
+            exec_inst.wait_for_results('1236', instance_ids),
+            dict((instance_id, {}) for instance_id in instance_ids))
+        self.assertEqual(
+            [c[1]['id'] for c in _client.node_instances.list.call_args_list],
+            [instance_ids[:100], instance_ids[100:]])
+
+    def test_ExecutionRunner_bind_logger(self):
+        _client = Mock()
+        _logger = Mock()
+        _bound_logger = Mock()
+        _client.executions.start = Mock(return_value=Mock(id='1234'))
+        exec_inst = execution.ExecutionRunner(_logger, _client)
+
+        bound = exec_inst.bind_logger(_bound_logger)
+        self.assertEqual(bound.run('deployment_id', 'id', 'list', {},
+                                   node_id='node'),
+                         '1234')
+        _bound_logger.assert_called_with('debug', 'Got execution ID: {}',
+                                         '1234')
+        _logger.assert_not_called()
+        self.assertIs(bound.poller.logger_method, _bound_logger)
+
+        # state shared with original runner
+        self.assertEqual(exec_inst.poller.pending, set(['1234']))
+        self.assertIn('1234', exec_inst._executions)
+        self.assertIs(bound.durations, exec_inst.durations)
+
+    def test_ExecutionRunner_cancel_pending(self):
+        _client = Mock()
+        _client.executions.start = Mock(side_effect=[
+            Mock(id='1'), Mock(id='2'), Mock(id='3')])
+        _client.executions.list = Mock(
+            return_value=[{'id': '1', 'status': 'terminated'},
+                          {'id': '2', 'status': 'started'},
+                          {'id': '3', 'status': 'started'}])
+        exec_inst = execution.ExecutionRunner(Mock(), _client)
+
+        for node_instance_id in ['a', 'b', 'c']:
+            exec_inst.run('deployment_id', node_instance_id, 'list', {})
+
+        self.assertEqual(exec_inst.wait_for_any(['1']), ['1'])
+
+        # not finished executions are cancelled, errors are only logged
+        _client.executions.cancel = Mock(side_effect=[
+            CloudifyClientError('finished'), None])
+        self.assertEqual(exec_inst.cancel_pending(), ['2', '3'])
+        self.assertEqual(
+            [c[0] for c in _client.executions.cancel.call_args_list],
+            [('2',), ('3',)])
+
+    def test_PollingStrategy(self):
+        strategy = execution.PollingStrategy(0.5, 5, 2, 0)
+        intervals = strategy.intervals()
+        self.assertEqual([next(intervals) for _ in range(6)],
+                         [0.5, 1.0, 2.0, 4.0, 5.0, 5.0])
+
+        # expected duration used as first interval
+        intervals = strategy.intervals(30)
+        self.assertEqual([next(intervals) for _ in range(3)],
+                         [30.0, 0.5, 1.0])
+
+        # jitter keeps intervals around base value
+        strategy = execution.PollingStrategy(1, 1, 2, 0.1)
+        for interval in itertools.islice(strategy.intervals(), 20):
+            self.assertTrue(0.9 <= interval <= 1.1)
+
+    @patch('time.sleep')
+    def test_ExecutionRunner_durations(self, _sleep):
+        _client = Mock()
+        _execution_start_mock = Mock()
+        _execution_start_mock.id = "1234"
+        _client.executions.start = Mock(return_value=_execution_start_mock)
+        _client.executions.list = Mock(
+            return_value=[{'id': '1234', 'status': 'terminated'}])
+        exec_inst = execution.ExecutionRunner(Mock(), _client, jitter=0)
+
+        with patch('time.time', Mock(return_value=100)):
+            exec_inst.run('deployment_id', 'id_0', 'list', {},
+                          node_id='node_a')
+        with patch('time.time', Mock(return_value=112)):
+            self.assertTrue(exec_inst._check_execution_status('1234'))
+        self.assertEqual(exec_inst.durations, {'node_a': 12})
+
+        # next execution of the same node waits for expected time first
+        _execution_start_mock.id = "1235"
+        _client.executions.list = Mock(side_effect=[
+            [{'id': '1235', 'status': 'started'}],
+            [{'id': '1235', 'status': 'terminated'}]])
+
+        with patch('time.time', Mock(return_value=200)):
+            exec_inst.run('deployment_id', 'id_1', 'list', {},
+                          node_id='node_a')
+        with patch('time.time', Mock(return_value=202)):
+            self.assertTrue(exec_inst._check_execution_status('1235'))
+        _sleep.assert_called_once_with(10.0)
+
 
 if __name__ == '__main__':
     unittest.main()
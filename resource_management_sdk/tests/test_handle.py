@@ -192,6 +192,7 @@ class TestHandle(unittest.TestCase):
         _ctx.instance.runtime_property_name = "runtime_property_name"
         _ctx.instance.runtime_properties = {}
         _ctx.run_execution = Mock(return_value={"runtime_property_name": 1})
+        _ctx.get_cached_result = Mock(return_value=None)
 
         # unsupported
         check_handle = handle.SimpleUsageHandler(mock_log)
@@ -215,6 +216,14 @@ class TestHandle(unittest.TestCase):
             call('debug', 'Setting {}', {'usage': 1})])
         _ctx.run_execution.assert_called_with()
 
+        # fresh result of previous execution
+        _ctx.run_execution.reset_mock()
+        _ctx.get_cached_result = Mock(
+            return_value={"runtime_property_name": 2})
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=2)
+        _ctx.run_execution.assert_not_called()
+
     def test_ExecutionResultUsageHandler_can_handle(self):
         mock_log = Mock()
         _ctx = Mock()
@@ -226,6 +235,7 @@ class TestHandle(unittest.TestCase):
         _ctx.instance.runtime_properties = {}
         _ctx.get_execution_result = Mock(
             return_value={"runtime_property_name": 1})
+        _ctx.get_cached_result = Mock(return_value=None)
 
         # unsupported
         check_handle = handle.ExecutionResultUsageHandler(mock_log)
@@ -248,6 +258,14 @@ class TestHandle(unittest.TestCase):
             call('debug', 'Setting {}', {'usage': 1})])
         _ctx.get_execution_result.assert_called_with()
 
+        # fresh result of previous execution
+        _ctx.get_execution_result.reset_mock()
+        _ctx.get_cached_result = Mock(
+            return_value={"runtime_property_name": 2})
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=2)
+        _ctx.get_execution_result.assert_not_called()
+
     def test_ExecutionStartUsageHandler_can_handle(self):
         mock_log = Mock()
         _ctx = Mock()
@@ -258,6 +276,7 @@ class TestHandle(unittest.TestCase):
         _ctx.instance.runtime_property_name = "runtime_property_name"
         _ctx.instance.runtime_properties = {}
         _ctx.run_execution = Mock(return_value="abcdef")
+        _ctx.get_cached_result = Mock(return_value=None)
 
         # unsupported
         check_handle = handle.ExecutionStartUsageHandler(mock_log)
@@ -275,6 +294,188 @@ class TestHandle(unittest.TestCase):
             call('info', 'Execution started with ID: abcdef ...')])
         _ctx.run_execution.assert_called_with(wait=False)
 
+        # fresh result of previous execution
+        _ctx.run_execution.reset_mock()
+        _ctx.get_cached_result = Mock(return_value={})
+        check_handle.handle(_ctx)
+        _ctx.run_execution.assert_not_called()
+
+    def test_BatchExecutionStartUsageHandler(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        _ctx.log = Mock()
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        _ctx.get_cached_result = Mock(return_value=None)
+        _ctx.run_batch_execution = Mock(return_value="abcdef")
+
+        check_handle = handle.BatchExecutionStartUsageHandler(mock_log)
+        self.assertTrue(check_handle.can_handle(_ctx))
+        check_handle.handle(_ctx)
+        _ctx.run_batch_execution.assert_called_with()
+        _ctx.run_execution.assert_not_called()
+        _ctx.log.assert_called_with(
+            'info', 'Usage will be gathered by execution with ID: {} ...',
+            'abcdef')
+
+        # fresh result of previous execution
+        _ctx.run_batch_execution.reset_mock()
+        _ctx.get_cached_result = Mock(return_value={})
+        check_handle.handle(_ctx)
+        _ctx.run_batch_execution.assert_not_called()
+
+    def test_BatchExecutionResultUsageHandler(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        _ctx.log = Mock()
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        _ctx.get_cached_result = Mock(return_value=None)
+        _ctx.instance.resource_name = "resource_name"
+        _ctx.instance.runtime_property_name = "runtime_property_name"
+        _ctx.get_batch_execution_result = Mock(
+            return_value={"runtime_property_name": 1})
+
+        check_handle = handle.BatchExecutionResultUsageHandler(mock_log)
+        self.assertTrue(check_handle.can_handle(_ctx))
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=1)
+        _ctx.get_batch_execution_result.assert_called_with()
+        _ctx.get_execution_result.assert_not_called()
+
+        # fresh result of previous execution
+        _ctx.get_batch_execution_result.reset_mock()
+        _ctx.get_cached_result = Mock(
+            return_value={"runtime_property_name": 2})
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=2)
+        _ctx.get_batch_execution_result.assert_not_called()
+
+    def test_WindowedExecutionStartUsageHandler(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        _ctx.log = Mock()
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        _ctx.get_cached_result = Mock(return_value=None)
+        _ctx.run_windowed_execution = Mock(return_value="abcdef")
+
+        check_handle = handle.WindowedExecutionStartUsageHandler(mock_log)
+        self.assertTrue(check_handle.can_handle(_ctx))
+        check_handle.handle(_ctx)
+        _ctx.run_windowed_execution.assert_called_with()
+        _ctx.run_execution.assert_not_called()
+        _ctx.log.assert_called_with(
+            'info', 'Execution started with ID: {} ...', 'abcdef')
+
+        # fresh result of previous execution
+        _ctx.run_windowed_execution.reset_mock()
+        _ctx.get_cached_result = Mock(return_value={})
+        check_handle.handle(_ctx)
+        _ctx.run_windowed_execution.assert_not_called()
+
+    def test_WindowedExecutionResultUsageHandler(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        _ctx.log = Mock()
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        _ctx.get_cached_result = Mock(return_value=None)
+        _ctx.instance.resource_name = "resource_name"
+        _ctx.instance.runtime_property_name = "runtime_property_name"
+        _ctx.get_windowed_execution_result = Mock(
+            return_value={"runtime_property_name": 1})
+
+        check_handle = handle.WindowedExecutionResultUsageHandler(mock_log)
+        self.assertTrue(check_handle.can_handle(_ctx))
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=1)
+        _ctx.get_windowed_execution_result.assert_called_with()
+        _ctx.get_execution_result.assert_not_called()
+
+        # fresh result of previous execution
+        _ctx.get_windowed_execution_result.reset_mock()
+        _ctx.get_cached_result = Mock(
+            return_value={"runtime_property_name": 2})
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=2)
+        _ctx.get_windowed_execution_result.assert_not_called()
+
+    def test_ConcurrentExecutionStartUsageHandler(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        _ctx.log = Mock()
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        _ctx.get_cached_result = Mock(return_value=None)
+
+        check_handle = handle.ConcurrentExecutionStartUsageHandler(mock_log)
+        self.assertTrue(check_handle.can_handle(_ctx))
+        check_handle.handle(_ctx)
+        _ctx.run_concurrent_execution.assert_called_with()
+        _ctx.run_execution.assert_not_called()
+
+        # fresh result of previous execution
+        _ctx.run_concurrent_execution.reset_mock()
+        _ctx.get_cached_result = Mock(return_value={})
+        check_handle.handle(_ctx)
+        _ctx.run_concurrent_execution.assert_not_called()
+
+    def test_ConcurrentExecutionResultUsageHandler(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        _ctx.log = Mock()
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        _ctx.get_cached_result = Mock(return_value=None)
+        _ctx.instance.resource_name = "resource_name"
+        _ctx.instance.runtime_property_name = "runtime_property_name"
+        _ctx.get_concurrent_execution_result = Mock(
+            return_value={"runtime_property_name": 1})
+
+        check_handle = handle.ConcurrentExecutionResultUsageHandler(mock_log)
+        self.assertTrue(check_handle.can_handle(_ctx))
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=1)
+        _ctx.get_concurrent_execution_result.assert_called_with()
+        _ctx.get_execution_result.assert_not_called()
+
+        # fresh result of previous execution
+        _ctx.get_concurrent_execution_result.reset_mock()
+        _ctx.get_cached_result = Mock(
+            return_value={"runtime_property_name": 2})
+        check_handle.handle(_ctx)
+        _ctx.set_value.assert_called_with(usage=2)
+        _ctx.get_concurrent_execution_result.assert_not_called()
+
+    def test_HandlerDispatcher(self):
+        mock_log = Mock()
+        _ctx = Mock()
+        openstack_handler = handle.OpenstackQuotaHandler(mock_log)
+        quota_handler = handle.SimpleQuotaHandler(mock_log)
+        usage_handler = handle.SimpleUsageHandler(mock_log)
+        custom_handler = Mock()
+        custom_handler.can_handle = Mock(return_value=False)
+
+        dispatcher = handle.HandlerDispatcher([
+            handle.ProjectHandler(mock_log),
+            openstack_handler,
+            quota_handler,
+            custom_handler,
+            usage_handler
+        ])
+
+        # secondary predicate checked
+        _ctx.instance.type = handle.NODE_TYPE_QUOTA
+        _ctx.instance.system_name = 'openstack'
+        self.assertEqual(dispatcher.get_handler(_ctx), openstack_handler)
+        _ctx.instance.system_name = 'other'
+        self.assertEqual(dispatcher.get_handler(_ctx), quota_handler)
+        custom_handler.can_handle.assert_not_called()
+
+        # handlers without declared node types checked for any type
+        _ctx.instance.type = handle.NODE_TYPE_USAGE
+        self.assertEqual(dispatcher.get_handler(_ctx), usage_handler)
+        custom_handler.can_handle.assert_called_once_with(_ctx)
+
+        _ctx.instance.type = handle.NODE_TYPE_RESULT
+        self.assertEqual(dispatcher.get_handler(_ctx), None)
+        self.assertEqual(custom_handler.can_handle.call_count, 2)
+
     def test_OpenstackQuotaHandler_suppress(self):
         mock_log = Mock()
         _ctx = Mock()
@@ -357,6 +558,7 @@ class TestHandle(unittest.TestCase):
         _ctx.add_result_instance_id = Mock()
         _ctx.set_runtime_properties = Mock()
         _ctx.dump = Mock(return_value={"a": "b"})
+        _ctx.execution_durations = {"node": 1.0}
 
         # unsupported
         check_handle = handle.ResultHandler(mock_log)
@@ -374,7 +576,9 @@ class TestHandle(unittest.TestCase):
                  'instance', "abc")])
         _ctx.add_result_instance_id.assert_called_with()
         _ctx.dump.assert_called_with()
-        _ctx.set_runtime_properties.assert_called_with({'data': {'a': 'b'}})
+        _ctx.set_runtime_properties.assert_called_with({
+            'data': {'a': 'b'},
+            handle.RUNTIME_PROPERTY_DURATIONS: {'node': 1.0}})
 
     def test_RuntimePropertyHandlerBase_process_process_number_value(self):
         _ctx = Mock()
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import unittest
-from mock import Mock
+from mock import Mock, patch
 from collections import OrderedDict
 
 from cloudify.exceptions import NonRecoverableError
@@ -28,7 +28,10 @@ class TestInit(unittest.TestCase):
         _instances_ctx.id = 'id'
         _instances_ctx.logger = Mock()
         _instances_ctx._node_instance.deployment_id = 'deployment_id'
-        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root', 'a']
+        _instances_ctx.node.type_hierarchy = [
+            'cloudify.nodes.Root',
+            'cloudify.nodes.resource_management.Project'
+        ]
         _instances_ctx.node.properties = {'system_name': 'system',
                                           'resource_name': 'resource',
                                           'scope': 'scope',
@@ -100,7 +103,8 @@ class TestInit(unittest.TestCase):
         _error = Mock()
         _error.message = "NoNeOfSuCh"
         engine._set_result_as_runtime_properties([_error])
-        _client.node_instances.get.assert_called_with('first')
+        _client.node_instances.get.assert_called_with(
+            'first', _include=['version', 'runtime_properties'])
         _client.node_instances.update.assert_called_with(
             'first', runtime_properties={
                 'a': 'b', 'errors': ['NoNeOfSuCh']
@@ -123,6 +127,164 @@ class TestInit(unittest.TestCase):
         our_magic_handler_type.assert_called_with(engine.logger)
         our_magic_handler.can_handle.assert_called_with(engine.rsm_ctx)
 
+    def test_Engine_run_pipeline(self):
+        _ctx = Mock()
+        _ctx.node_instances = []
+
+        for instance_id, node_type in [('project', 'Project'),
+                                       ('usage', 'Usage'),
+                                       ('result', 'Result'),
+                                       ('quota', 'Quota')]:
+            _instances_ctx = Mock()
+            _instances_ctx.id = instance_id
+            _instances_ctx.node.type_hierarchy = [
+                'cloudify.nodes.Root',
+                'cloudify.nodes.resource_management.' + node_type
+            ]
+            _instances_ctx.node.properties = {}
+            _instances_ctx._node_instance.runtime_properties = {}
+            _ctx.node_instances.append(_instances_ctx)
+
+        engine = sdk.Engine(_ctx, Mock())
+        calls = []
+
+        def handler_type(name, node_type, child_type=None):
+            def handle(rsm_ctx):
+                calls.append((name, rsm_ctx.instance.id))
+
+                if child_type:
+                    rsm_ctx._instances.add_project('p', [sdk.instance.Instance(
+                        'child', 'deployment', [child_type], {}, {})])
+
+            handler = Mock()
+            handler.can_handle = Mock(
+                side_effect=lambda rsm_ctx: rsm_ctx.instance.type == node_type)
+            handler.handle = Mock(side_effect=handle)
+            return Mock(return_value=handler)
+
+        project = 'cloudify.nodes.resource_management.Project'
+        usage = 'cloudify.nodes.resource_management.Usage'
+        result = 'cloudify.nodes.resource_management.Result'
+        quota = 'cloudify.nodes.resource_management.Quota'
+        pipeline = sdk.Pipeline([
+            [handler_type('resolve', project, child_type=quota)],
+            [handler_type('start', usage)],
+            [handler_type('quota', quota)],
+            [handler_type('wait', usage)],
+            [handler_type('dump', result)]
+        ], barriers=[3, 4])
+
+        with patch.object(engine.rsm_ctx._instances, 'reset',
+                          wraps=engine.rsm_ctx._instances.reset) as _reset:
+            engine.run(pipeline)
+
+        _reset.assert_called_once_with()
+        self.assertEqual(calls, [
+            ('resolve', 'project'),
+            ('start', 'usage'),
+            ('quota', 'quota'),
+            # instance added by project resolution in the same pass
+            ('quota', 'child'),
+            # barrier stages after all instances passed previous ones
+            ('wait', 'usage'),
+            ('dump', 'result')])
+
+    def test_Engine_limit_to_profile(self):
+        engine, _client, _ctx, _instances_ctx = self._get_engine()
+        engine.limit_to_profile(
+            'abc', '{"project": {"system": {"resource": 5.0}}}')
+        self.assertEqual(engine.rsm_ctx._required_resources,
+                         {'abc': {'system': set(['resource'])}})
+
+        # project instance not related to validated project is skipped
+        handler = Mock()
+        handler.can_handle = Mock(return_value=True)
+        handler_type = Mock(return_value=handler)
+        engine.run([handler_type])
+        handler.handle.assert_not_called()
+
+    def test_Engine_fail_fast(self):
+        engine, _client, _ctx, _instances_ctx = self._get_engine()
+        engine.enable_fail_fast(
+            'abc', '{"global": {"system": {"resource": 5.0}}}')
+        engine.rsm_ctx.cancel_executions = Mock(return_value=['1'])
+
+        handler = Mock()
+        handler.can_handle = Mock(return_value=True)
+        handler.handle = Mock(
+            side_effect=lambda rsm_ctx: rsm_ctx.set_value(quota=10, usage=8))
+        next_handler = Mock()
+        next_handler.can_handle = Mock(return_value=True)
+
+        # run stopped on first not met requirement
+        with self.assertRaises(NonRecoverableError):
+            engine.run([Mock(return_value=handler),
+                        Mock(return_value=next_handler)])
+
+        engine.rsm_ctx.cancel_executions.assert_called_once_with()
+        next_handler.handle.assert_not_called()
+
+    def test_Engine_fail_fast_result_instance(self):
+        engine, _client, _ctx, _instances_ctx = self._get_engine()
+        _result_ctx = Mock()
+        _result_ctx.id = 'result'
+        _result_ctx.node.type_hierarchy = [
+            'cloudify.nodes.Root',
+            'cloudify.nodes.resource_management.Result'
+        ]
+        _result_ctx.node.properties = {}
+        _result_ctx._node_instance.runtime_properties = {}
+        _ctx.node_instances.append(_result_ctx)
+        engine = sdk.Engine(_ctx, _client)
+        engine.enable_fail_fast(
+            'abc', '{"global": {"system": {"resource": 5.0}}}')
+        engine.rsm_ctx.cancel_executions = Mock(return_value=[])
+        _client.node_instances.get = Mock(return_value={
+            'version': 2,
+            'runtime_properties': {}
+        })
+
+        handler = Mock()
+        handler.can_handle = Mock(
+            side_effect=lambda rsm_ctx: rsm_ctx.instance.id == 'id')
+        handler.handle = Mock(
+            side_effect=lambda rsm_ctx: rsm_ctx.set_value(quota=10, usage=8))
+
+        # run stopped before result instance is reached
+        with self.assertRaises(NonRecoverableError):
+            engine.run([Mock(return_value=handler)])
+
+        # errors saved in result instance anyway
+        self.assertEqual(engine.rsm_ctx.result_instances, ['result'])
+        _client.node_instances.update.assert_called_once_with(
+            'result', runtime_properties={'errors': [
+                'Profile requirement not met for resource: system/resource '
+                'in project: global. Requirement is resource=5.0, but only '
+                '2.0 is available']}, version=2)
+
+    def test_Engine_report_saved_executions(self):
+        engine, _client, _ctx, _instances_ctx = self._get_engine()
+        engine.rsm_ctx._saved_executions = 3
+        engine._report_data()
+        engine.logger.info.assert_any_call(
+            'Executions saved by sharing results between equivalent '
+            'usage node instances: 3')
+
+    def test_Engine_run_no_supported_instances(self):
+        _instances_ctx = Mock()
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              'cloudify.nodes.Compute']
+        _ctx = Mock()
+        _ctx.node_instances = [_instances_ctx]
+        engine = sdk.Engine(_ctx, Mock())
+
+        handler = Mock()
+        handler_type = Mock(return_value=handler)
+        engine.run([handler_type])
+        handler.can_handle.assert_not_called()
+        engine.logger.info.assert_called_with(
+            '\nCalculated resources availabilities: \n')
+
 
 if __name__ == '__main__':
     unittest.main()
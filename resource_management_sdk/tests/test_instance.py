@@ -15,12 +15,24 @@ import unittest
 from mock import Mock
 from collections import OrderedDict
 
+from cloudify_rest_client.responses import ListResponse
+
+import resource_management_sdk.constants as constants
 import resource_management_sdk.instance as instance
 
 
+def _list_response(items, total=None):
+    """Rest client list response with pagination metadata"""
+    return ListResponse(items, {'pagination': {
+        'total': len(items) if total is None else total,
+        'offset': 0,
+        'size': len(items)
+    }})
+
+
 class TestInstance(unittest.TestCase):
 
-    def _check_instance(self, inst):
+    def _check_instance(self, inst, node_type='a'):
         self.assertEqual(inst.id, 'id')
         self.assertEqual(inst.deployment_id, 'deployment_id')
         self.assertEqual(inst.resource_name, 'resource')
@@ -28,7 +40,7 @@ class TestInstance(unittest.TestCase):
         self.assertEqual(inst.runtime_property_value, 'd')
         self.assertEqual(inst.scope, 'scope')
         self.assertEqual(inst.system_name, 'system')
-        self.assertEqual(inst.type, 'a')
+        self.assertEqual(inst.type, node_type)
         self.assertEqual(inst.execution_id, None)
         self.assertEqual(inst.runtime_properties, {'resource': 'b',
                                                    'c': 'd'})
@@ -75,7 +87,8 @@ class TestInstance(unittest.TestCase):
         _instances_ctx = Mock()
         _instances_ctx.id = 'id'
         _instances_ctx._node_instance.deployment_id = 'deployment_id'
-        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root', 'a']
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              constants.NODE_TYPE_QUOTA]
         _instances_ctx.node.properties = {'system_name': 'system',
                                           'resource_name': 'resource',
                                           'scope': 'scope',
@@ -87,7 +100,7 @@ class TestInstance(unittest.TestCase):
 
         inst = instance.WorkflowCtxInstanceAdapter.get_instances(_ctx)
         self.assertEqual(len(inst), 1)
-        self._check_instance(inst[0])
+        self._check_instance(inst[0], constants.NODE_TYPE_QUOTA)
 
     def test_RestClientInstanceAdapter_not_empty(self):
         _client = Mock()
@@ -96,13 +109,17 @@ class TestInstance(unittest.TestCase):
         _instance = Mock()
         _node = Mock()
 
-        _client.node_instances.list = Mock(return_value=[_instance])
-        _client.nodes.get = Mock(return_value=_node)
+        _client.node_instances.list = Mock(
+            return_value=_list_response([_instance]))
+        _client.nodes.list = Mock(return_value=[_node])
+        _client.nodes.get = Mock()
 
         _instance.id = 'id'
         _instance.deployment_id = 'deployment_id'
         _instance.node_id = 'node_id'
-        _node.type_hierarchy = ['cloudify.nodes.Root', 'a']
+        _node.id = 'node_id'
+        _node.type_hierarchy = ['cloudify.nodes.Root',
+                                constants.NODE_TYPE_QUOTA]
         _node.properties = {'system_name': 'system',
                             'resource_name': 'resource',
                             'scope': 'scope',
@@ -113,21 +130,293 @@ class TestInstance(unittest.TestCase):
         inst = instance.RestClientInstanceAdapter.get_instances(
             _client, 'deployment_id')
         # calls
-        _client.nodes.get.assert_called_with(deployment_id='deployment_id',
-                                             node_id='node_id')
+        _client.nodes.list.assert_called_with(
+            deployment_id='deployment_id',
+            _include=['id', 'type_hierarchy', 'properties'])
+        _client.nodes.get.assert_not_called()
         _client.node_instances.list.assert_called_with(
-            deployment_id='deployment_id')
+            deployment_id='deployment_id', node_id=['node_id'],
+            _offset=0, _size=1000,
+            _include=['id', 'node_id', 'deployment_id',
+                      'runtime_properties'])
 
         # results
         self.assertEqual(len(inst), 1)
-        self._check_instance(inst[0])
+        self._check_instance(inst[0], constants.NODE_TYPE_QUOTA)
+
+    def _gen_rest_instances(self, count):
+        _instances = []
+
+        for i in range(count):
+            _instance = Mock()
+            _instance.id = 'id_{}'.format(i)
+            _instance.deployment_id = 'deployment_id'
+            _instance.node_id = 'node_{}'.format(i % 2)
+            _instance.runtime_properties = {}
+            _instances.append(_instance)
+
+        return _instances
+
+    def _gen_rest_nodes(self):
+        _nodes = []
+
+        for i in range(2):
+            _node = Mock()
+            _node.id = 'node_{}'.format(i)
+            _node.type_hierarchy = ['cloudify.nodes.Root',
+                                    constants.NODE_TYPE_QUOTA]
+            _node.properties = {'system_name': 'system_{}'.format(i)}
+            _nodes.append(_node)
+
+        return _nodes
+
+    def test_RestClientInstanceAdapter_calls_count(self):
+        for count in [1, 10, 100]:
+            _client = Mock()
+            _client.node_instances.list = Mock(
+                return_value=_list_response(self._gen_rest_instances(count)))
+            _client.nodes.list = Mock(return_value=self._gen_rest_nodes())
+
+            inst = instance.RestClientInstanceAdapter.get_instances(
+                _client, 'deployment_id')
+
+            self.assertEqual(len(inst), count)
+            self.assertEqual(inst[-1].id, 'id_{}'.format(count - 1))
+            self.assertEqual(inst[-1].system_name,
+                             'system_{}'.format((count - 1) % 2))
+            self.assertEqual(_client.node_instances.list.call_count, 1)
+            self.assertEqual(_client.nodes.list.call_count, 1)
+            self.assertEqual(_client.nodes.get.call_count, 0)
+
+    def test_RestClientInstanceAdapter_filter(self):
+        _client = Mock()
+        _instances = self._gen_rest_instances(3)
+        _nodes = self._gen_rest_nodes()
+        _nodes[1].type_hierarchy = ['cloudify.nodes.Root',
+                                    'cloudify.nodes.Compute']
+        _client.node_instances.list = Mock(
+            return_value=_list_response(_instances))
+        _client.nodes.list = Mock(return_value=_nodes)
+
+        # only instances of supported nodes requested and returned
+        inst = instance.RestClientInstanceAdapter.get_instances(
+            _client, 'deployment_id')
+        self.assertEqual([i.id for i in inst], ['id_0', 'id_2'])
+        self.assertEqual(
+            _client.node_instances.list.call_args[1]['node_id'],
+            ['node_0'])
+
+        # no supported nodes - no instances requested
+        _client.node_instances.list.reset_mock()
+        _client.nodes.list = Mock(return_value=_nodes[1:])
+        self.assertEqual(
+            instance.RestClientInstanceAdapter.get_instances(
+                _client, 'deployment_id'),
+            [])
+        _client.node_instances.list.assert_not_called()
+
+    def test_WorkflowCtxInstanceAdapter_filter(self):
+        _ctx = Mock()
+        _ctx.node_instances = []
+
+        for node_type in ['cloudify.nodes.Compute',
+                          constants.NODE_TYPE_USAGE,
+                          'cloudify.nodes.Network',
+                          constants.NODE_TYPE_RESULT]:
+            _instances_ctx = Mock()
+            _instances_ctx.id = node_type
+            _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                                  node_type]
+            _instances_ctx.node.properties = {}
+            _instances_ctx._node_instance.runtime_properties = {}
+            _ctx.node_instances.append(_instances_ctx)
+
+        inst = instance.WorkflowCtxInstanceAdapter.get_instances(_ctx)
+        self.assertEqual([i.id for i in inst],
+                         [constants.NODE_TYPE_USAGE,
+                          constants.NODE_TYPE_RESULT])
+
+    def test_RestClientInstanceAdapter_pagination(self):
+        _client = Mock()
+        _instances = self._gen_rest_instances(7)
+
+        def list_instances(deployment_id, node_id, _offset, _size, _include):
+            return _list_response(_instances[_offset:_offset + _size],
+                                  len(_instances))
+
+        _client.node_instances.list = Mock(side_effect=list_instances)
+        _client.nodes.list = Mock(return_value=self._gen_rest_nodes())
+
+        inst = instance.RestClientInstanceAdapter.iter_instances(
+            _client, 'deployment_id', 3)
+
+        # nothing requested before iteration
+        self.assertEqual(_client.node_instances.list.call_count, 0)
+        self.assertEqual(next(inst).id, 'id_0')
+        self.assertEqual(_client.node_instances.list.call_count, 1)
+        self.assertEqual([i.id for i in inst],
+                         ['id_{}'.format(i) for i in range(1, 7)])
+        self.assertEqual(
+            [c[1]['_offset']
+             for c in _client.node_instances.list.call_args_list],
+            [0, 3, 6])
+
+        # last page is full - total count reached, no more requests
+        _client.node_instances.list.reset_mock()
+        inst = instance.RestClientInstanceAdapter.get_instances(
+            _client, 'deployment_id', 7)
+        self.assertEqual(len(inst), 7)
+        self.assertEqual(_client.node_instances.list.call_count, 1)
+
+    def test_RestClientInstanceAdapter_prefetch_instances(self):
+        _client = Mock()
+        _instances = self._gen_rest_instances(7)
+
+        def list_instances(deployment_id, node_id, _offset, _size, _include):
+            return _list_response(_instances[_offset:_offset + _size],
+                                  len(_instances))
+
+        _client.node_instances.list = Mock(side_effect=list_instances)
+        _client.nodes.list = Mock(return_value=self._gen_rest_nodes())
+
+        # only first page requested before iteration
+        inst = instance.RestClientInstanceAdapter.prefetch_instances(
+            _client, 'deployment_id', 3)
+        self.assertEqual(_client.node_instances.list.call_count, 1)
+        self.assertEqual([next(inst).id for _ in range(3)],
+                         ['id_0', 'id_1', 'id_2'])
+        self.assertEqual(_client.node_instances.list.call_count, 1)
+
+        # next pages requested during iteration
+        self.assertEqual([i.id for i in inst],
+                         ['id_{}'.format(i) for i in range(3, 7)])
+        self.assertEqual(
+            [c[1]['_offset']
+             for c in _client.node_instances.list.call_args_list],
+            [0, 3, 6])
+
+    def test_RestClientInstanceAdapter_pagination_server_limit(self):
+        _client = Mock()
+        _instances = self._gen_rest_instances(7)
+
+        # server returns no more than 2 items in one page
+        def list_instances(deployment_id, node_id, _offset, _size, _include):
+            return _list_response(_instances[_offset:_offset + min(_size, 2)],
+                                  len(_instances))
+
+        _client.node_instances.list = Mock(side_effect=list_instances)
+        _client.nodes.list = Mock(return_value=self._gen_rest_nodes())
+
+        inst = instance.RestClientInstanceAdapter.get_instances(
+            _client, 'deployment_id', 5)
+        self.assertEqual([i.id for i in inst],
+                         ['id_{}'.format(i) for i in range(7)])
+        self.assertEqual(
+            [c[1]['_offset']
+             for c in _client.node_instances.list.call_args_list],
+            [0, 2, 4, 6])
+
+        # empty page ends iteration even if total count is not reached
+        _client.node_instances.list = Mock(
+            return_value=_list_response([], 7))
+        self.assertEqual(
+            instance.RestClientInstanceAdapter.get_instances(
+                _client, 'deployment_id'),
+            [])
+        self.assertEqual(_client.node_instances.list.call_count, 1)
+
+    def test_Instances_add_project_iterable(self):
+        inst = instance.Instances(Mock(), [Mock()])
+
+        self.assertEqual(inst.add_project('proj', iter([Mock(), Mock()])), 2)
+        self.assertEqual(inst.left_instances,
+                         OrderedDict([('global', 0), ('proj', 2)]))
+        self.assertEqual(len(inst.reset() and inst.instances), 3)
+
+    def test_Instances_left_counters(self):
+        inst = instance.Instances(Mock(), [Mock(), Mock()])
+
+        def scan():
+            left = OrderedDict(
+                (project, 0) for project in inst._initial_data.keys())
+
+            for position in range(len(inst.instances)):
+                instance_info = inst._get_instance_info(position)
+
+                if not instance_info['visited']:
+                    left[instance_info['project']] += 1
+
+            return left
+
+        self.assertEqual(inst.left_instances,
+                         OrderedDict([('global', 1)]))
+        inst.add_project('a', [Mock(), Mock(), Mock()])
+        inst.add_project('b', [])
+
+        while True:
+            self.assertEqual(inst.left_instances, scan())
+
+            if not inst.next_instance():
+                break
+
+        self.assertEqual(inst.left_instances,
+                         OrderedDict([('global', 0), ('a', 0), ('b', 0)]))
+
+        # counters rebuilt on reset
+        inst.reset()
+        self.assertEqual(inst.left_instances,
+                         OrderedDict([('global', 1), ('a', 3), ('b', 0)]))
+        self.assertEqual(inst.dump()['left'], inst.left_instances)
+
+    def test_Instances_reset(self):
+        _instances = [Mock(), Mock()]
+        inst = instance.Instances(Mock(), _instances[:1])
+        inst.add_project('a', _instances[1:])
+        project_indexes = inst._project_indexes
+
+        while inst.next_instance():
+            pass
+
+        # operational data reused
+        inst.reset()
+        self.assertTrue(inst._project_indexes is project_indexes)
+        self.assertEqual(inst.instances, _instances)
+        self.assertEqual(inst.current_project, 'global')
+        self.assertEqual(inst.dump()['to_be_processed'],
+                         [i.id for i in _instances[1:]])
+
+        # replaced project - rebuilt in order of projects
+        _new_instance = Mock()
+        inst.add_project('global', [_new_instance])
+        self.assertEqual(inst.instances, _instances + [_new_instance])
+        inst.reset()
+        self.assertEqual(inst.instances, [_new_instance, _instances[1]])
+        self.assertEqual(inst.current_project, 'global')
+        self.assertEqual(inst.next_instance(), {
+            'instance': _instances[1],
+            'project': 'a',
+            'visited': True})
+
+    def test_Instances_next_instance_visited(self):
+        # many visited instances are skipped without recursion
+        inst = instance.Instances(Mock(), [Mock()])
+        inst.add_project('a', [object() for _ in range(100000)])
+        inst.add_project('b', [Mock()])
+
+        for position in range(100001):
+            inst._visited[position] = 1
+
+        self.assertEqual(inst.next_instance()['project'], 'b')
+        self.assertEqual(inst.position, 100001)
+        self.assertEqual(inst.next_instance(), None)
 
     def test_Instances_not_empty(self):
         _instances_ctx = Mock()
         _instances_ctx.logger = Mock()
         _instances_ctx.id = 'id'
         _instances_ctx._node_instance.deployment_id = 'deployment_id'
-        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root', 'a']
+        _instances_ctx.node.type_hierarchy = ['cloudify.nodes.Root',
+                                              constants.NODE_TYPE_QUOTA]
         _instances_ctx.node.properties = {'system_name': 'system',
                                           'resource_name': 'resource',
                                           'scope': 'scope',
@@ -141,7 +430,8 @@ class TestInstance(unittest.TestCase):
             _ctx.logger,
             instance.WorkflowCtxInstanceAdapter.get_instances(_ctx)
         )
-        self._check_instance(inst.current_instance)
+        self._check_instance(inst.current_instance,
+                             constants.NODE_TYPE_QUOTA)
         self.assertEqual(inst.current_project, 'global')
         self.assertEqual(inst.dump(), {
             'to_be_processed': [],
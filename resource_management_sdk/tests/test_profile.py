@@ -105,6 +105,51 @@ class TestProfile(unittest.TestCase):
                 }
             })
 
+    def test_get_resource_keys(self):
+        res_prof = profile.ResourcesProfile.get_profile_from_dict(Mock(), {
+            data.SCOPE_PROJECT: {
+                "system": {
+                    "resource": "100"
+                }
+            },
+            data.SCOPE_GLOBAL: {
+                "system": {
+                    "other": "10"
+                }
+            }
+        })
+
+        self.assertEqual(
+            sorted(key.as_tuple() for key in res_prof.get_resource_keys('a')),
+            [('a', 'system', 'resource'),
+             ('global', 'system', 'other')])
+
+    def test_check_requirement(self):
+        resource_key = data.ResourceKey(
+            data.SCOPE_PROJECT, "system", "resource", "a")
+
+        self.assertTrue(isinstance(
+            profile.ResourcesProfile.check_requirement(
+                resource_key, 10.0, None),
+            profile.CannotDetermineAvailabilityError))
+        self.assertTrue(isinstance(
+            profile.ResourcesProfile.check_requirement(
+                resource_key, 10.0, data.ResourceAvailability(-1, 5)),
+            profile.CannotDetermineAvailabilityError))
+        self.assertTrue(isinstance(
+            profile.ResourcesProfile.check_requirement(
+                resource_key, 10.0, data.ResourceAvailability(10, 5)),
+            profile.NoAvailableResourcesError))
+        # computed availability 0 is not undetermined
+        self.assertTrue(isinstance(
+            profile.ResourcesProfile.check_requirement(
+                resource_key, 1.0, data.ResourceAvailability(5, 5)),
+            profile.NoAvailableResourcesError))
+        self.assertEqual(
+            profile.ResourcesProfile.check_requirement(
+                resource_key, 5.0, data.ResourceAvailability(10, 5)),
+            None)
+
     def test_validate(self):
         res_prof = profile.ResourcesProfile.get_profile_from_dict(Mock(), {
             data.SCOPE_PROJECT: {
@@ -117,9 +162,9 @@ class TestProfile(unittest.TestCase):
         _ava = Mock()
         _ava.availability = 10.1
         _ctx = Mock()
-        _ctx.collected_data = {data.ResourceKey(
+        _ctx.get_availability_data = {data.ResourceKey(
             data.SCOPE_PROJECT, "system", "resource", "a"
-        ): _ava}
+        ): _ava}.get
 
         # no such stats
         errors = res_prof.validate(_ctx, data.SCOPE_GLOBAL)
@@ -137,9 +182,9 @@ class TestProfile(unittest.TestCase):
         _ava = Mock()
         _ava.availability = 1000
         _ctx = Mock()
-        _ctx.collected_data = {data.ResourceKey(
+        _ctx.get_availability_data = {data.ResourceKey(
             data.SCOPE_PROJECT, "system", "resource", "a"
-        ): _ava}
+        ): _ava}.get
 
         errors = res_prof.validate(_ctx, "a")
         self.assertEqual(len(errors), 0)